@@ -3,6 +3,7 @@ from importlib.util import find_spec
 
 from .errors_fallback import (
     write_failed_startup_message,
+    write_lease_held_message,
     write_needs_sync_message,
 )
 
@@ -12,17 +13,68 @@ if not find_spec("discord"):
     sys.exit(-1)
 
 
-from . import jar_io
+from . import export, fsck, jar_io, standby
 from .bot import bot
+from .data import ArgData
 from .errors import NeedsSyncError
+from .lease import Lease
 
 
-args = jar_io.read_args()
-config = jar_io.read_config()
-try:
-    bot.prepare_run(args, config)
-except NeedsSyncError:
-    write_needs_sync_message()
-    sys.exit(-1)
+def main() -> None:
+    args = jar_io.read_args()
+    config = jar_io.read_config()
+    jar_io.set_guild_format(config.guild_format)
+    if args.export_path or args.import_path or args.check or args.repair:
+        lease = None
+        if args.import_path or args.repair:  # writes the data directory
+            lease = Lease()
+            if not lease.try_acquire():
+                write_lease_held_message()
+                sys.exit(-1)
+            jar_io.set_fence(lease.check)
+        try:
+            succeeded = _run_offline(args)
+        finally:
+            if lease:
+                lease.release()
+        sys.exit(0 if succeeded else -1)
+
+    try:
+        bot.prepare_run(args, config)
+    except NeedsSyncError:
+        write_needs_sync_message()
+        sys.exit(-1)
+
+    if not args.sync:
+        lease = Lease()
+        if args.standby:
+            standby.wait_for_lease(bot.data, lease)
+        elif not lease.try_acquire():
+            write_lease_held_message()
+            sys.exit(-1)
+        bot.hold_lease(lease)
+
+    bot.run()
+
+
+def _run_offline(args: ArgData) -> bool:
+    if args.export_path or args.import_path:
+        _transfer(args)
+        return True
+    return fsck.run(repair=args.repair)
+
+
+def _transfer(args: ArgData) -> None:
+    def report(count: int) -> None:
+        sys.stderr.write(f"{count} guilds...\n")
+
+    if args.export_path:
+        count = export.export_guilds(args.export_path, report)
+        sys.stderr.write(f"Exported {count} guilds.\n")
+    elif args.import_path:
+        count = export.import_guilds(args.import_path, report)
+        sys.stderr.write(f"Imported {count} guilds.\n")
+
 
-bot.run()
+if __name__ == "__main__":  # guard against re-execution in worker processes
+    main()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import enum
+import logging
+from typing import AsyncIterator
+
+from discord.ext import tasks
+
+from .errors import OverloadedError
+
+
+MAX_CONCURRENT = 16  # commands in flight across all guilds
+RATE = 2.0  # commands per second and guild
+BURST = 10  # commands a guild may send at once
+MAX_WAIT = 2.0  # seconds; Discord requires a response within 3 seconds
+
+_LAG_INTERVAL = 0.5
+_LAG_DECAY = 0.5  # per tick, so a single fast tick does not end shedding
+_PRUNE_INTERVAL = 60.0
+
+
+class Shed(str, enum.Enum):
+    rate = "rate"  # the guild used up its bucket
+    lag = "lag"  # the event loop lags and no slot is free
+    queue = "queue"  # no slot became free in time
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, now: float) -> None:
+        self.tokens = float(BURST)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token and return the seconds until it is available."""
+        self.tokens = min(self.tokens + (now - self.updated) * RATE, BURST)
+        self.updated = now
+        self.tokens -= 1
+        return max(-self.tokens / RATE, 0.0)
+
+    def refund(self) -> None:
+        self.tokens += 1
+
+
+class Admission:
+    """Admission control in front of the command dispatch.
+
+    Every guild has a token bucket limiting its rate of commands. At most
+    ``MAX_CONCURRENT`` commands run at once; further commands wait in one
+    queue per guild and free slots are handed to the queues in turn, so a
+    busy guild cannot delay the commands of others. While the event loop lags
+    by more than ``threshold`` seconds, commands that would have to wait are
+    shed instead with an ``OverloadedError``.
+    """
+
+    def __init__(self) -> None:
+        self.threshold = 0.5  # seconds
+        self.lag = 0.0  # seconds
+        self.admitted = 0
+        self.shed: collections.Counter[Shed] = collections.Counter()
+        self._in_flight = 0
+        self._buckets: dict[int, _Bucket] = {}
+        # ordered by turn; a guild moves to the back after each handover
+        self._queues: dict[int, collections.deque[asyncio.Future]] = {}
+        self._tick: float | None = None
+        self._pruned = 0.0
+
+    @property
+    def overloaded(self) -> bool:
+        return self.lag > self.threshold
+
+    def stats(self) -> dict:
+        return {
+            "lag_ms": round(self.lag * 1000, 3),
+            "overloaded": self.overloaded,
+            "in_flight": self._in_flight,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "admitted": self.admitted,
+            "shed": {str(reason): self.shed[reason] for reason in Shed},
+        }
+
+    @contextlib.asynccontextmanager
+    async def admit(self, guild_id: int | None) -> AsyncIterator[None]:
+        await self._acquire(guild_id or 0)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @tasks.loop(seconds=_LAG_INTERVAL)
+    async def lag_loop(self) -> None:
+        now = asyncio.get_running_loop().time()
+        if self._tick is not None:
+            lag = max(now - self._tick - _LAG_INTERVAL, 0.0)
+            was_overloaded = self.overloaded
+            self.lag = max(lag, self.lag * _LAG_DECAY)
+            if self.overloaded != was_overloaded:
+                _log_overloaded(self.overloaded, self.lag)
+        self._tick = now
+
+        if now - self._pruned > _PRUNE_INTERVAL:
+            self._pruned = now
+            refilled = now - BURST / RATE
+            self._buckets = {
+                id_: bucket
+                for id_, bucket in self._buckets.items()
+                if bucket.updated > refilled
+            }
+
+    async def _acquire(self, guild_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        bucket = self._buckets.get(guild_id)
+        if not bucket:
+            bucket = self._buckets[guild_id] = _Bucket(loop.time())
+
+        delay = bucket.take(loop.time())
+        if delay and (self.overloaded or delay > MAX_WAIT):
+            bucket.refund()
+            self._shed(Shed.rate, delay)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self._in_flight < MAX_CONCURRENT and not self._queues:
+            self._in_flight += 1
+            self.admitted += 1
+            return
+        if self.overloaded:
+            self._shed(Shed.lag, MAX_WAIT)
+
+        future = loop.create_future()
+        self._queues.setdefault(guild_id, collections.deque()).append(future)
+        try:
+            await asyncio.wait_for(future, MAX_WAIT - delay)
+        except asyncio.TimeoutError:
+            if self._withdraw(guild_id, future):
+                self._shed(Shed.queue, MAX_WAIT)
+        except asyncio.CancelledError:
+            if not self._withdraw(guild_id, future):
+                self._release()
+            raise
+        self.admitted += 1
+
+    def _release(self) -> None:
+        # hand the slot to the next guild in turn
+        while self._queues:
+            guild_id = next(iter(self._queues))
+            queue = self._queues.pop(guild_id)
+            future = queue.popleft()
+            if queue:
+                self._queues[guild_id] = queue
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _withdraw(self, guild_id: int, future: asyncio.Future) -> bool:
+        """Remove a waiting command, False if it got a slot already."""
+        if future.done() and not future.cancelled():
+            return False
+        queue = self._queues.get(guild_id)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._queues[guild_id]
+        return True
+
+    def _shed(self, reason: Shed, retry_after: float) -> None:
+        self.shed[reason] += 1
+        raise OverloadedError(retry_after)
+
+
+def _log_overloaded(overloaded: bool, lag: float) -> None:
+    logger = logging.getLogger("discord.jar.admission")
+    if overloaded:
+        logger.warning("event loop lags by %.0f ms, shedding load", lag * 1000)
+    else:
+        logger.info("event loop lag recovered, stop shedding load")
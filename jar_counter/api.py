@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import collections
+import logging
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from aiohttp import web
+
+from .data import get_jar_name
+
+
+if TYPE_CHECKING:
+    from .admission import Admission
+    from .data import GuildData, Guilds
+
+
+_BACKLOG = 32  # pending connections; further ones are refused by the OS
+_KEEPALIVE_TIMEOUT = 5.0  # seconds an idle connection is kept open
+_MAX_CONNECTIONS = 32  # open connections; requests on further ones get 503
+_MAX_SORTED = 256  # cached sorted jar keys
+_DEFAULT_LIMIT = 100
+_MAX_LIMIT = 1000
+
+
+class Api:
+    """Read-only HTTP API serving guild data from memory.
+
+    Runs on the event loop of the bot. Every request is answered from memory
+    without awaiting anything. Requests on connections beyond the open ones
+    allowed are answered with 503 and their connection is closed, so clients
+    cannot hold many connections open. Responses carry an ETag derived from
+    the version of the guild data, so unchanged data can be revalidated with
+    If-None-Match.
+
+    Routes:
+        GET /guilds/{id}: settings and jar count of a guild
+        GET /guilds/{id}/jars?name=&offset=&limit=: jars sorted by member id
+            and jar name; only the jars with a name if given, "" for the
+            default jars
+        GET /status: event loop lag and admission counters of the bot
+    """
+
+    def __init__(self, guilds: Guilds, admission: Admission) -> None:
+        self._guilds = guilds
+        self._admission = admission
+        self._runner: web.AppRunner | None = None
+        # sorted jar keys per guild and jar name filter for pagination;
+        # keyed by ETag, least recently used first
+        self._sorted_keys: collections.OrderedDict[
+            tuple[int, str | None],
+            tuple[str, list[tuple[int, str]]],
+        ] = collections.OrderedDict()
+
+    async def start(self, host: str, port: int) -> None:
+        app = web.Application(middlewares=[self._limit_connections])
+        app.router.add_get("/guilds/{id}", self._get_guild)
+        app.router.add_get("/guilds/{id}/jars", self._get_jars)
+        app.router.add_get("/status", self._get_status)
+
+        self._runner = web.AppRunner(
+            app,
+            access_log=None,
+            keepalive_timeout=_KEEPALIVE_TIMEOUT,
+        )
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port, backlog=_BACKLOG).start()
+        logging.getLogger("discord.jar.api").info(
+            "serving API on http://%s:%d",
+            host,
+            port,
+        )
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _limit_connections(
+        self,
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        # counts the connections open on the server, idle keep-alive ones
+        # included, not only the requests being answered
+        if self._runner and (
+            len(self._runner.server.connections) > _MAX_CONNECTIONS
+        ):
+            response = web.Response(status=503, headers={"Retry-After": "1"})
+            response.force_close()
+            return response
+        return await handler(request)
+
+    def forget(self, id_: int) -> None:
+        """Drop the cached data of a guild, e.g. once it is unloaded."""
+        for key in [key for key in self._sorted_keys if key[0] == id_]:
+            del self._sorted_keys[key]
+
+    async def _get_guild(self, request: web.Request) -> web.Response:
+        id_, data = self._get_data(request)
+        if response := _check_etag(request, data):
+            return response
+
+        return _json(
+            data,
+            {
+                "id": str(id_),
+                "moderator_role_id": str(data.moderator_role_id),
+                "moderator_role_name": data.moderator_role_name,
+                "responses_visibility": str(data.responses_visibility),
+                "mentions_use": data.mentions_use,
+                "schedule": str(data.schedule),
+                "decay": data.decay,
+                "jar_count": len(data.jars),
+                "jar_names": data.jars.names(),
+                "scoreboard_jar": data.scoreboard_jar,
+            },
+        )
+
+    async def _get_jars(self, request: web.Request) -> web.Response:
+        id_, data = self._get_data(request)
+        if response := _check_etag(request, data):
+            return response
+
+        try:
+            offset = max(int(request.query.get("offset", 0)), 0)
+            limit = int(request.query.get("limit", _DEFAULT_LIMIT))
+            limit = min(max(limit, 1), _MAX_LIMIT)
+        except ValueError as exc:
+            raise web.HTTPBadRequest(text="invalid offset or limit") from exc
+
+        name = request.query.get("name")
+        if name is not None:
+            name = get_jar_name(name)
+        keys = self._get_sorted_keys(id_, data, name)
+        page = keys[offset : offset + limit]
+        jars = [(key, data.jars.get(key)) for key in page]
+        return _json(
+            data,
+            {
+                "id": str(id_),
+                "total": len(keys),
+                "offset": offset,
+                "limit": limit,
+                "jars": [
+                    {
+                        "member_id": str(member_id),
+                        "name": jar_name,
+                        "currency": jar.currency,
+                        "suffix": jar.suffix,
+                        "count": jar.count,
+                    }
+                    for (member_id, jar_name), jar in jars
+                    if jar
+                ],
+            },
+        )
+
+    async def _get_status(self, _: web.Request) -> web.Response:
+        return web.json_response(self._admission.stats())
+
+    def _get_data(self, request: web.Request) -> tuple[int, GuildData]:
+        try:
+            id_ = int(request.match_info["id"])
+        except ValueError as exc:
+            raise web.HTTPNotFound from exc
+
+        # only guilds loaded by the bot; reading files here would block the
+        # event loop, and readers could churn a cache of them
+        if data := self._guilds.get_loaded(id_):
+            return id_, data
+        raise web.HTTPNotFound
+
+    def _get_sorted_keys(
+        self,
+        id_: int,
+        data: GuildData,
+        name: str | None,
+    ) -> list[tuple[int, str]]:
+        etag = _get_etag(data)
+        cached = self._sorted_keys.get((id_, name))
+        if not cached or cached[0] != etag:
+            if name is None:
+                keys = sorted(data.jars.keys())
+            else:  # only the jars with the name; see Jars.named
+                keys = sorted(
+                    (member_id, name) for member_id in data.jars.named(name)
+                )
+            cached = (etag, keys)
+        _put(self._sorted_keys, (id_, name), cached, _MAX_SORTED)
+        return cached[1]
+
+
+def _put(
+    cache: collections.OrderedDict,
+    key: object,
+    value: object,
+    size: int,
+) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _get_etag(data: GuildData) -> str:
+    return f'"{data.generation}-{data.version}"'
+
+
+def _check_etag(request: web.Request, data: GuildData) -> web.Response | None:
+    etag = _get_etag(data)
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers={"ETag": etag})
+    return None
+
+
+def _json(data: GuildData, body: dict) -> web.Response:
+    return web.json_response(body, headers={"ETag": _get_etag(data)})
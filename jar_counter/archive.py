@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Callable
+
+from discord.ext import tasks
+
+from . import jar_io
+from .errors import GuildNotSetupError
+
+
+if TYPE_CHECKING:
+    import discord as dc
+
+    from .data import Guilds
+
+
+class Departures:
+    """Track members and guilds that left and archive their data.
+
+    Data is moved to the compressed archive in ``data/archive`` once the
+    grace period has passed. Archived guilds are restored when loaded, archived
+    jars when the member joins again.
+    """
+
+    def __init__(self, guilds: Guilds) -> None:
+        self._guilds = guilds
+        self._departures: dict | None = None  # lazy load
+        self._dirty = False  # departures of members not written yet
+        self.grace_period = 7 * 24 * 60 * 60.0  # seconds
+        self.on_archived: Callable[[int], None] | None = None  # jars only
+
+    def guild_left(self, guild_id: int) -> None:
+        self._get()["guilds"][str(guild_id)] = time.time()
+        self._write()
+
+    def guild_joined(self, guild_id: int) -> None:
+        if self._get()["guilds"].pop(str(guild_id), None):
+            self._write()
+
+    def member_left(self, guild_id: int, member_id: int) -> None:
+        if data := self._guilds.get_loaded(guild_id):
+            if not data.jars.of_member(member_id):
+                return  # nothing to archive
+        else:
+            try:
+                if member_id not in jar_io.read_member_ids(guild_id):
+                    return
+            except FileNotFoundError:
+                return  # not set up or archived
+        members = self._get()["members"].setdefault(str(guild_id), {})
+        members[str(member_id)] = time.time()
+        self._dirty = True  # frequent in large guilds; see write_loop
+
+    def member_joined(self, member: dc.Member) -> bool:
+        """Cancel a pending departure or restore archived jars.
+
+        Returns:
+            whether the member has a jar in a loaded guild
+
+        """
+        departures = self._get()["members"]
+        members = departures.get(str(member.guild.id), {})
+        left = members.pop(str(member.id), None)
+        if left:
+            if not members:
+                del departures[str(member.guild.id)]
+            self._write()  # right away; archiving a member here loses jars
+
+        # only load the guild if the member may have jars to keep or restore
+        data = self._guilds.get_loaded(member.guild.id)
+        if not data and not left:
+            if not jar_io.has_archived_jars(member.guild.id):
+                return False
+        try:
+            data = data or self._guilds.load(member.guild.id)
+        except GuildNotSetupError:
+            return False
+        if data.jars.of_member(member.id):
+            return True
+
+        if not (archived := jar_io.restore_jars(member.guild.id, member.id)):
+            return False
+        for name, (jar, history) in archived.items():
+            data.jars[member, name] = jar
+            if history:
+                data.history[member.id, name] = history
+        data.dirty = True
+        return True
+
+    @tasks.loop(hours=1)
+    async def archive_loop(self) -> None:
+        deadline = time.time() - self.grace_period
+        departures = self._get()
+        changed = False
+
+        for guild_id, left in list(departures["guilds"].items()):
+            if left <= deadline:
+                self._archive_guild(int(guild_id))
+                departures["members"].pop(guild_id, None)
+                del departures["guilds"][guild_id]
+                changed = True
+
+        for guild_id, members in list(departures["members"].items()):
+            expired = [id_ for id_, left in members.items() if left <= deadline]
+            if expired:
+                self._archive_jars(int(guild_id), [int(id_) for id_ in expired])
+                for id_ in expired:
+                    del members[id_]
+                changed = True
+            if not members:
+                del departures["members"][guild_id]
+
+        if changed or self._dirty:
+            self._write()
+
+    @tasks.loop(seconds=10)
+    async def write_loop(self) -> None:
+        self.flush()
+
+    def _archive_guild(self, guild_id: int) -> None:
+        self._guilds.unload(guild_id)  # flush pending changes
+        jar_io.archive_guild(guild_id)
+        logging.getLogger("discord.jar.archive").info(
+            "archived guild %d",
+            guild_id,
+        )
+
+    def _archive_jars(self, guild_id: int, member_ids: list[int]) -> None:
+        loaded = self._guilds.get_loaded(guild_id)
+        try:
+            data = loaded or self._guilds.load(guild_id)
+        except GuildNotSetupError:
+            return
+
+        try:
+            archived = {}
+            for member_id in member_ids:
+                for name in data.jars.of_member(member_id):
+                    key = (member_id, name)
+                    jar = data.jars.pop(key)
+                    archived[key] = (jar, data.history.pop(key, None))
+            if not archived:
+                return
+            data.dirty = True  # bumps the version; written right away below
+
+            jar_io.archive_jars(guild_id, archived)
+            jar_io.write_guild(guild_id, data)  # keep the jars in one place
+            data.dirty = False
+            if self.on_archived:
+                self.on_archived(guild_id)
+            logging.getLogger("discord.jar.archive").info(
+                "archived %d jars of guild %d",
+                len(archived),
+                guild_id,
+            )
+        finally:
+            if not loaded:  # loaded for archiving only
+                self._guilds.unload(guild_id)
+
+    def _get(self) -> dict:
+        if self._departures is None:
+            self._departures = jar_io.read_departures()
+        return self._departures
+
+    def flush(self) -> None:
+        if self._dirty:
+            self._write()
+
+    def _write(self) -> None:
+        jar_io.write_departures(self._get())
+        self._dirty = False
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import datetime
 import logging
-import re
+import signal
+import time
+from pathlib import Path
 from typing import Any, Callable, Optional
 
 import discord as dc
 
-from . import change, reuse, sync
+from . import change, export, history, jar_io, jobs, reuse, sync, tracing
+from .admission import Admission
+from .api import Api
+from .archive import Departures
 from .data import (
     ArgData,
     ConfigData,
@@ -14,17 +22,29 @@ from .data import (
     Guilds,
     JarData,
     Jars,
+    Schedule,
     Visibility,
+    get_jar_name,
 )
 from .decorators import (
     confirmation,
     has_jar,
     has_no_jar,
+    is_host,
     is_moderator,
     is_not_on_cooldown,
     is_not_own_jar,
 )
-from .errors import GuildNotSetupError, NeedsSyncError, get_error_message
+from .errors import (
+    GuildNotSetupError,
+    NeedsSyncError,
+    get_error_message,
+)
+from .lease import Lease
+from .owners import JarName, JarOwner, Owners
+from .permissions import Moderators
+from .profiling import Profiler
+from .scoreboard import Scoreboards
 
 
 # ruff: noqa: UP007 <- type annotations on commands are evaluated at runtime
@@ -32,19 +52,53 @@ from .errors import GuildNotSetupError, NeedsSyncError, get_error_message
 
 
 class _ErrorMessageCommandTree(dc.app_commands.CommandTree):
+    def __init__(self, client: dc.Client, admission: Admission) -> None:
+        super().__init__(client)
+        self._admission = admission
+
+    async def _call(self, intr: dc.Interaction) -> None:
+        # admission control in front of the dispatch of every command; an
+        # OverloadedError is sent to the user by on_error
+        if intr.type != dc.InteractionType.application_command:
+            # autocomplete runs on every keystroke and must answer at once;
+            # it neither uses up the bucket nor waits for a slot
+            await super()._call(intr)
+            return
+        async with self._admission.admit(intr.guild_id):
+            await super()._call(intr)
+
+    async def interaction_check(self, intr: dc.Interaction) -> bool:
+        if intr.type == dc.InteractionType.application_command:
+            tracing.start(intr)
+        return True
+
     async def on_error(
         self,
         intr: dc.Interaction,
         exc: dc.app_commands.AppCommandError,
     ) -> None:
         await intr.response.send_message(get_error_message(exc), ephemeral=True)
+        tracing.finish(intr, exc, _get_guild_size(intr))
 
 
 class _JarBot(dc.Client):
     def __init__(self) -> None:
-        super().__init__(intents=dc.Intents(message_content=True, guilds=True))
+        super().__init__(
+            intents=dc.Intents(message_content=True, guilds=True, members=True),
+        )
         self.data = Guilds()
-        self._command_tree = _ErrorMessageCommandTree(self)
+        self.moderators = Moderators(self.data)
+        self.owners = Owners(self.data)
+        self.departures = Departures(self.data)
+        self.jobs = jobs.Jobs(self.data)
+        self.scoreboards = Scoreboards(self.data, self)
+        self.jobs.on_applied = self.scoreboards.mark_all
+        self.departures.on_archived = self.scoreboards.mark_all
+        self.profiler = Profiler(self.data)
+        self.admission = Admission()
+        self.api = Api(self.data, self.admission)
+        self.data.on_unload = self._on_guild_unload
+        self._command_tree = _ErrorMessageCommandTree(self, self.admission)
         self._jar_command_group = dc.app_commands.Group(
             name="jar",
             description="Primary command group.",
@@ -56,6 +110,9 @@ class _JarBot(dc.Client):
         self._sync_and_exit: bool
         self._token: str
         self.host_contact: str
+        self._api_address: tuple[str, int | None]
+        self._lease: Lease | None = None
+        self._writable = True  # until the lease is lost
 
     def prepare_run(self, args: ArgData, config: ConfigData) -> None:
         will_be_synced = args.sync
@@ -65,6 +122,28 @@ class _JarBot(dc.Client):
         self._sync_and_exit = args.sync
         self._token = config.token
         self.host_contact = config.host_contact
+        self.departures.grace_period = config.archive_after_days * 24 * 60 * 60
+        self.scoreboards.window = config.scoreboard_window_seconds
+        tracing.configure(config.trace_threshold_ms)
+        self.admission.threshold = config.lag_threshold_ms / 1000
+        self._api_address = (config.api_host, config.api_port)
+
+    def hold_lease(self, lease: Lease) -> None:
+        def on_lost() -> None:
+            # another instance took over; stop without writing any more data
+            # or editing any more messages
+            self._lease = None
+            self._writable = False
+            self.data.write_loop.cancel()
+            self.departures.archive_loop.cancel()
+            self.departures.write_loop.cancel()
+            self.jobs.job_loop.cancel()
+            self.scoreboards.edit_loop.cancel()
+            asyncio.get_running_loop().create_task(self.close())
+
+        self._lease = lease
+        lease.on_lost = on_lost
+        jar_io.set_fence(lease.check)
 
     def run(self) -> None:  # pyright: ignore[reportIncompatibleMethodOverride]
         super().run(self._token)
@@ -93,8 +172,90 @@ class _JarBot(dc.Client):
         if self._sync_and_exit:
             await self.sync_commands(caller=None)
             await self.close()  # will exit
+            return
 
+        if self._lease:
+            self._lease.check_loop.start()
         self.data.write_loop.start()
+        self.departures.archive_loop.start()
+        self.departures.write_loop.start()
+        self.jobs.job_loop.start()
+        self.scoreboards.edit_loop.start()
+        self.admission.lag_loop.start()
+
+        if hasattr(signal, "SIGUSR1"):  # not available on Windows
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGUSR1,
+                self.profiler.start,
+            )
+
+        host, port = self._api_address
+        if port:
+            await self.api.start(host, port)
+
+    async def close(self) -> None:
+        await self.api.stop()
+        await super().close()
+        if self._writable:  # also without a lease, e.g. with --sync
+            self.data.write_loop.cancel()
+            self.departures.write_loop.cancel()
+            self.data.flush()  # a standby may take over right after release
+            self.departures.flush()
+        if self._lease:
+            self._lease.check_loop.cancel()
+            self._lease.release()
+
+    async def on_app_command_completion(
+        self,
+        intr: dc.Interaction,
+        _: dc.app_commands.Command | dc.app_commands.ContextMenu,
+    ) -> None:
+        tracing.finish(intr, guild_size=_get_guild_size(intr))
+
+    async def on_guild_role_update(self, _: dc.Role, after: dc.Role) -> None:
+        self.moderators.invalidate_guild(after.guild.id)
+
+    async def on_guild_role_delete(self, role: dc.Role) -> None:
+        self.moderators.invalidate_guild(role.guild.id)
+
+    async def on_member_update(
+        self,
+        before: dc.Member,
+        after: dc.Member,
+    ) -> None:
+        if before.display_name != after.display_name:
+            self.owners.rename(after)
+
+    async def on_user_update(self, before: dc.User, after: dc.User) -> None:
+        if before.display_name == after.display_name:
+            return
+        for guild in after.mutual_guilds:
+            if member := guild.get_member(after.id):
+                self.owners.rename(member)
+
+    async def on_raw_member_remove(
+        self,
+        event: dc.RawMemberRemoveEvent,
+    ) -> None:
+        self.owners.remove(event.guild_id, event.user.id)
+        self.departures.member_left(event.guild_id, event.user.id)
+
+    async def on_member_join(self, member: dc.Member) -> None:
+        if self.departures.member_joined(member):
+            self.owners.add(member)
+            self.scoreboards.mark_all(member.guild.id)  # jars may be restored
+
+    def _on_guild_unload(self, guild_id: int) -> None:
+        self.api.forget(guild_id)
+        self.owners.drop(guild_id)  # indices exist for loaded guilds only
+
+    async def on_guild_join(self, guild: dc.Guild) -> None:
+        self.departures.guild_joined(guild.id)
+
+    async def on_guild_remove(self, guild: dc.Guild) -> None:
+        self.moderators.invalidate_guild(guild.id)
+        self.owners.drop(guild.id)
+        self.departures.guild_left(guild.id)
 
     async def respond(
         self,
@@ -110,7 +271,13 @@ class _JarBot(dc.Client):
         content = content.replace("%@", name, 1)
 
         ephemeral = self.data[intr].responses_visibility == Visibility.hidden
-        await intr.response.send_message(content, ephemeral=ephemeral)
+        with tracing.span(intr, "respond"):
+            await intr.response.send_message(content, ephemeral=ephemeral)
+
+
+def _get_guild_size(intr: dc.Interaction) -> int | None:
+    data = bot.data.get_loaded(intr.guild_id) if intr.guild_id else None
+    return len(data.jars) if data else None
 
 
 bot = _JarBot()
@@ -132,18 +299,24 @@ The following commands are available:
 - `/jar help`: {get_doc(_help)}
 - `/jar contact`: {get_doc(_contact)}
 - `/jar sync` `[MOD]`: {get_doc(_sync)}
+- `/jar export` `[HOST]`: {get_doc(_export)}
+- `/jar profile` `[HOST]`: {get_doc(_profile)}
 - `/jar setup` `[MOD*]`: {get_doc(_setup)}
 - `/jar create` `[MOD]`: {get_doc(_create)}
 - `/jar edit` `[MOD]`: {get_doc(_edit)}
 - `/jar add` `[COOLDOWN]` `[REUSE]`: {get_doc(_add)}
 - `/jar subtract` `[NOT-SELF]` `[COOLDOWN]` `[REUSE]`: {get_doc(_subtract)}
 - `/jar show` `[REUSE]`: {get_doc(_show)}
+- `/jar history` `[REUSE]`: {get_doc(_history)}
+- `/jar totals`: {get_doc(_totals)}
+- `/jar scoreboard` `[MOD]`: {get_doc(_scoreboard)}
 - `/jar empty` `[MOD]` `[NOT-SELF]` `[CONFIRM]`: {get_doc(_empty)}
 - `/jar delete` `[MOD]` `[NOT-SELF]` `[CONFIRM]`: {get_doc(_delete)}
 
 Some commands are paired with modifiers:
 - `[MOD]`: requires moderator role to be called
 - `[MOD*]`: requires moderator role only if a valid role is known
+- `[HOST]`: may only be called by the host of the bot
 - `[NOT-SELF]`: may not be called for your own jar
 - `[COOLDOWN]`: has a short (server-wide) cooldown after each call
 - `[REUSE]`: not specifying a server member will reuse the last used one
@@ -152,7 +325,13 @@ Some commands are paired with modifiers:
 If the bot has just been invited to the server, you must specify a moderator \
 role using `/jar setup`. Additionally the response visibility and mention-use \
 can be configured in the same command. These options will affects responses to \
-all commands with the exception of `help`, `contact`, `sync` and `setup`.
+all commands with the exception of `help`, `contact`, `sync` and `setup`. \
+Furthermore a daily, weekly or monthly reset or decay of all jars can be \
+scheduled.
+
+A member may own several jars with different names, e.g. one per game. All \
+jar commands take an optional jar name; without one they use the default jar \
+of the member.
 """
     await intr.response.send_message(content, ephemeral=True)
 
@@ -185,17 +364,75 @@ async def _sync(intr: dc.Interaction) -> None:
     )
 
 
+@bot.command
+@is_not_on_cooldown(seconds=60 * 5)
+@is_host()
+async def _export(intr: dc.Interaction) -> None:
+    """Export the data of all servers to a file on the host machine."""
+    await intr.response.send_message("Start exporting.", ephemeral=True)
+
+    path = Path(export.EXPORT_DIR, f"export_{int(time.time())}.ndjson.gz")
+    path.parent.mkdir(exist_ok=True)
+    bot.departures.flush()  # exported from disk
+    logger = logging.getLogger("discord.jar.export")
+    count = await export.export_guilds_live(
+        path,
+        bot.data,
+        lambda n: logger.info("exported %d guilds", n),
+    )
+    logger.info("finished export of %d guilds to %s", count, path)
+
+    await intr.followup.send(
+        f"Exported {count} servers to `{path}`.",
+        ephemeral=True,
+    )
+
+
+@bot.command
+@is_host()
+async def _profile(
+    intr: dc.Interaction,
+    seconds: dc.app_commands.Range[int, 1, 600] = 30,
+) -> None:
+    """Profile the bot and write the results to files on the host machine.
+
+    Args:
+        seconds: the duration of the profile; or 30 if empty
+
+    """
+    if bot.profiler.running:
+        await intr.response.send_message(
+            "A profile is already running.",
+            ephemeral=True,
+        )
+        return
+
+    await intr.response.send_message(
+        f"Start profiling for {seconds} seconds.",
+        ephemeral=True,
+    )
+    path = await bot.profiler.run(seconds)
+    await intr.followup.send(
+        f"Finished profiling. See `{path}`.",
+        ephemeral=True,
+    )
+
+
 class _SetupDummyData:
     moderator_role_id = None
     responses_visibility = None
     mentions_use = None
+    schedule = None
+    decay = None
 
 
-def _setup_guild(
+def _setup_guild(  # noqa: PLR0913
     intr: dc.Interaction,
     moderator: dc.Role,
     responses: Visibility,
     mentions: bool,  # noqa: FBT001
+    schedule: Schedule,
+    decay: int,
 ) -> _SetupDummyData:
     guild_data = GuildData(
         Jars(),
@@ -203,6 +440,9 @@ def _setup_guild(
         moderator.name,
         responses,
         mentions,
+        schedule,
+        decay,
+        jobs.get_period(schedule, _now()),
     )
     bot.data[intr] = guild_data
 
@@ -216,6 +456,8 @@ async def _setup(
     moderator: Optional[dc.Role] = None,
     responses: Optional[Visibility] = None,
     mentions: Optional[bool] = None,
+    schedule: Optional[Schedule] = None,
+    decay: Optional[dc.app_commands.Range[int, 1, 100]] = None,
 ) -> None:
     """Configure different options of the bot.
 
@@ -225,6 +467,8 @@ async def _setup(
             responses visible to caller only
         mentions: True = @-mention jar owner in responses; False = refer to jar
             owner with display name
+        schedule: how often all jars are reduced by the decay automatically
+        decay: the percentage removed from all jars per schedule; 100 = reset
 
     """
     try:
@@ -237,23 +481,49 @@ async def _setup(
             raise
         responses = responses or Visibility.visible
         mentions = mentions if mentions is not None else True
-        data = _setup_guild(intr, moderator, responses, mentions)
+        schedule = schedule or Schedule.never
+        decay = decay or 100
+        data = _setup_guild(
+            intr,
+            moderator,
+            responses,
+            mentions,
+            schedule,
+            decay,
+        )
 
     mod_id = moderator.id if moderator else None
     mod_change = change.document_change(data, "moderator_role_id", mod_id)
     res_change = change.document_change(data, "responses_visibility", responses)
     ment_change = change.document_change(data, "mentions_use", mentions)
+    sched_change = change.document_change(data, "schedule", schedule)
+    dec_change = change.document_change(data, "decay", decay)
     if mod_change:
         mod_change.name = "moderator role"
-
-    content = change.combine_message(mod_change, res_change, ment_change)
-    content = re.sub(r"(\d+)", r"<@&\1>", content)  # format ids to @-mentions
+        # format ids to @-mentions
+        mod_change.old = mod_change.old and f"<@&{mod_change.old}>"
+        mod_change.new = f"<@&{mod_change.new}>"
+    if sched_change:
+        # first run at the start of the next period
+        bot.data[intr].schedule_period = jobs.get_period(schedule, _now())
+    if dec_change:
+        dec_change.old = dec_change.old and f"{dec_change.old}%"
+        dec_change.new = f"{dec_change.new}%"
+
+    changes = (mod_change, res_change, ment_change, sched_change, dec_change)
+    content = change.combine_message(*changes)
     await intr.response.send_message(content, ephemeral=True)
 
-    if mod_change or res_change or ment_change:
+    if mod_change:
+        bot.moderators.invalidate_guild(intr.guild_id)
+    if any(changes):
         bot.data[intr].dirty = True
 
 
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
 @bot.command
 @has_no_jar()
 @is_moderator()
@@ -262,6 +532,7 @@ async def _create(
     member: dc.Member,
     currency: str,
     suffix: bool,  # noqa: FBT001 <- kw-only arg would break command interface
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
 ) -> None:
     """Create a new jar for a server member.
 
@@ -270,12 +541,20 @@ async def _create(
         currency: the currency of the jar; can be any text like emojis
         suffix: automatically append an 's' to the currency when appropriate
             e.g. '1 coin', '2 coins'
+        name: the name of the jar; or the default jar if empty
 
     """
+    name = get_jar_name(name)
     jar = JarData(currency, suffix)
-    bot.data[intr].jars[member] = jar
+    bot.data[intr].jars[member, name] = jar
+    bot.owners.add(member)
+    bot.scoreboards.mark(member.guild.id, member.id, name)
 
-    await bot.respond(intr, f"Created a jar for %@ filled with {jar}!", member)
+    await bot.respond(
+        intr,
+        f"Created a {_jar(name)} for %@ filled with {jar}!",
+        member,
+    )
 
     reuse.set_member(member)
     bot.data[intr].dirty = True
@@ -289,6 +568,7 @@ async def _edit(
     member: dc.Member,
     currency: Optional[str] = None,
     suffix: Optional[bool] = None,
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
 ) -> None:
     """Edit the currency and suffix of a jar.
 
@@ -297,32 +577,46 @@ async def _edit(
         currency: the currency of the jar; can be any text like emojis
         suffix: automatically append an 's' to the currency when appropriate
             e.g. '1 coin', '2 coins'
+        name: the name of the jar; or the default jar if empty
 
     """
-    jar = bot.data[intr].jars[member]
+    name = get_jar_name(name)
+    jar = bot.data[intr].jars[member, name]
     cur_change = change.document_change(jar, "currency", currency)
     suf_change = change.document_change(jar, "suffix", suffix)
 
+    prefix = f"{_jar(name).capitalize()} of %@"
     await bot.respond(
         intr,
-        change.combine_message(cur_change, suf_change, prefix="Jar of %@"),
+        change.combine_message(cur_change, suf_change, prefix=prefix),
         member,
     )
 
     reuse.set_member(member)
+    if cur_change:
+        # previous changes are measured in a different currency
+        bot.data[intr].history.discard(member, name)
     if cur_change or suf_change:
         bot.data[intr].dirty = True
+        bot.scoreboards.mark(member.guild.id, member.id, name)
+
+
+def _jar(name: str) -> str:
+    """Refer to a jar by its name in responses."""
+    return f"`{name}` jar" if name else "jar"
 
 
 async def _change_jar_counter(
     intr: dc.Interaction,
     amount: int,
     member: dc.Member | None,
+    name: str | None,
     *,
     should_subtract: bool,
 ) -> None:
     member = member or reuse.get_member()
-    jar = bot.data[intr].jars[member]
+    name = get_jar_name(name)
+    jar = bot.data[intr].jars[member, name]
 
     if should_subtract:
         amount = min(amount, jar.count)
@@ -332,14 +626,17 @@ async def _change_jar_counter(
 
     change = JarData(jar.currency, jar.suffix, count=amount)
     if should_subtract:
-        msg = f"Removed {change} from the jar of %@!"
+        msg = f"Removed {change} from the {_jar(name)} of %@!"
     else:
-        msg = f"Added {change} to the jar of %@!"
+        msg = f"Added {change} to the {_jar(name)} of %@!"
     await bot.respond(intr, msg, member)
 
     reuse.set_member(member)
     if amount > 0:
+        delta = -amount if should_subtract else amount
+        bot.data[intr].history.record(member, name, delta)
         bot.data[intr].dirty = True
+        bot.scoreboards.mark(member.guild.id, member.id, name)
 
 
 @bot.command
@@ -348,16 +645,18 @@ async def _change_jar_counter(
 async def _add(
     intr: dc.Interaction,
     amount: dc.app_commands.Range[int, 1, None] = 1,
-    member: Optional[dc.Member] = None,
+    member: Optional[dc.app_commands.Transform[dc.Member, JarOwner]] = None,
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
 ) -> None:
     """Add some amount to a jar.
 
     Args:
         amount: the amount to add; or 1 if empty
         member: the owner of the jar; or if empty reuse the last used one
+        name: the name of the jar; or the default jar if empty
 
     """
-    await _change_jar_counter(intr, amount, member, should_subtract=False)
+    await _change_jar_counter(intr, amount, member, name, should_subtract=False)
 
 
 @bot.command
@@ -367,74 +666,204 @@ async def _add(
 async def _subtract(
     intr: dc.Interaction,
     amount: dc.app_commands.Range[int, 1, None] = 1,
-    member: Optional[dc.Member] = None,
+    member: Optional[dc.app_commands.Transform[dc.Member, JarOwner]] = None,
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
 ) -> None:
     """Remove some amount from a jar.
 
     Args:
         amount: the amount to subtract; or 1 if empty
         member: the owner of the jar; or if empty reuse the last used one
+        name: the name of the jar; or the default jar if empty
 
     """
-    await _change_jar_counter(intr, amount, member, should_subtract=True)
+    await _change_jar_counter(intr, amount, member, name, should_subtract=True)
 
 
 @bot.command
 @has_jar()
 async def _show(
     intr: dc.Interaction,
-    member: Optional[dc.Member] = None,
+    member: Optional[dc.app_commands.Transform[dc.Member, JarOwner]] = None,
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
 ) -> None:
     """Show the contents of a jar.
 
     Args:
         member: the owner of the jar; or if empty reuse the last used one
+        name: the name of the jar; or the default jar if empty
 
     """
     member = member or reuse.get_member()
-    jar = bot.data[intr].jars[member]
-    await bot.respond(intr, f"%@ has {jar} in the jar!", member)
+    name = get_jar_name(name)
+    jar = bot.data[intr].jars[member, name]
+    await bot.respond(intr, f"%@ has {jar} in the {_jar(name)}!", member)
 
     reuse.set_member(member)
 
 
 @bot.command
-@confirmation(lambda member: f"empty the jar of {member.mention}")
+@has_jar()
+async def _history(
+    intr: dc.Interaction,
+    days: dc.app_commands.Range[int, 1, history.DAYS_SIZE] = 7,
+    member: Optional[dc.app_commands.Transform[dc.Member, JarOwner]] = None,
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
+) -> None:
+    """Show the daily changes of a jar.
+
+    Args:
+        days: the number of days to show; or 7 if empty
+        member: the owner of the jar; or if empty reuse the last used one
+        name: the name of the jar; or the default jar if empty
+
+    """
+    member = member or reuse.get_member()
+    name = get_jar_name(name)
+    jar = bot.data[intr].jars[member, name]
+    daily = bot.data[intr].history.daily(member, name, days)
+
+    lines = [f"Changes to the {_jar(name)} of %@ in the last {days} days:"]
+    for day, delta in daily.items():
+        sign = "+" if delta > 0 else "-"
+        amount = JarData(jar.currency, jar.suffix, count=abs(delta))
+        lines.append(f"- {history.format_day(day)}: {sign}{amount}")
+    if not daily:
+        lines.append("No changes.")
+    await bot.respond(intr, "\n".join(lines), member)
+
+    reuse.set_member(member)
+
+
+@bot.command
+async def _totals(intr: dc.Interaction) -> None:
+    """Show the number of jars and their total count per jar name."""
+    data = bot.data[intr]
+    lines = ["Jars of this server:"]
+    for name in data.jars.names():
+        named = data.jars.named(name)
+        total = sum(jar.count for jar in named.values())
+        count = f"{len(named)} jar{'s' if len(named) != 1 else ''}"
+        lines.append(f"- {_jar(name)}: {count} with {total} in total")
+    if not data.jars:
+        lines.append("No jars yet.")
+
+    ephemeral = data.responses_visibility == Visibility.hidden
+    await intr.response.send_message("\n".join(lines), ephemeral=ephemeral)
+
+
+@bot.command
+@is_not_on_cooldown(seconds=60)
+@is_moderator()
+async def _scoreboard(
+    intr: dc.Interaction,
+    enabled: bool = True,  # noqa: FBT001, FBT002
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
+) -> None:
+    """Post a live scoreboard of all jars in this channel.
+
+    Args:
+        enabled: True = post a new scoreboard replacing the previous one;
+            False = stop updating the scoreboard
+        name: the name of the jars to rank; or the default jars if empty
+
+    """
+    data = bot.data[intr]
+    if not enabled:
+        data.scoreboard_channel_id = 0
+        data.scoreboard_message_id = 0
+        data.dirty = True
+        await intr.response.send_message("Disabled scoreboard.", ephemeral=True)
+        return
+
+    if not isinstance(intr.channel, dc.abc.Messageable):
+        raise dc.app_commands.NoPrivateMessage
+    data.scoreboard_jar = get_jar_name(name)
+    bot.scoreboards.reset(intr.guild_id)  # type: ignore[arg-type]
+    message = await intr.channel.send(
+        bot.scoreboards.render(intr.guild_id, data),  # type: ignore[arg-type]
+        allowed_mentions=dc.AllowedMentions.none(),
+    )
+    with contextlib.suppress(dc.HTTPException):  # pinning is optional
+        await message.pin()
+
+    data.scoreboard_channel_id = message.channel.id
+    data.scoreboard_message_id = message.id
+    data.dirty = True
+    await intr.response.send_message(
+        "Posted scoreboard. It updates automatically.",
+        ephemeral=True,
+    )
+
+
+@bot.command
+@confirmation(
+    lambda member, name=None: (
+        f"empty the {_jar(get_jar_name(name))} of {member.mention}"
+    ),
+)
 @is_not_own_jar()
 @has_jar()
 @is_moderator()
-async def _empty(intr: dc.Interaction, member: dc.Member) -> None:
+async def _empty(
+    intr: dc.Interaction,
+    member: dc.Member,
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
+) -> None:
     """Reset the counter of a jar to zero.
 
     Args:
         member: the owner of the jar
+        name: the name of the jar; or the default jar if empty
 
     """
-    jar = bot.data[intr].jars[member]
-    await bot.respond(intr, f"Emptied the jar of %@ by {jar}!", member)
+    name = get_jar_name(name)
+    jar = bot.data[intr].jars[member, name]
+    await bot.respond(intr, f"Emptied the {_jar(name)} of %@ by {jar}!", member)
     change = jar.count
     jar.count = 0
 
     reuse.set_member(member)
     if change > 0:
+        bot.data[intr].history.record(member, name, -change)
         bot.data[intr].dirty = True
+        bot.scoreboards.mark(member.guild.id, member.id, name)
 
 
 @bot.command
-@confirmation(lambda member: f"delete the jar of {member.mention}")
+@confirmation(
+    lambda member, name=None: (
+        f"delete the {_jar(get_jar_name(name))} of {member.mention}"
+    ),
+)
 @is_not_own_jar()
 @has_jar()
 @is_moderator()
-async def _delete(intr: dc.Interaction, member: dc.Member) -> None:
+async def _delete(
+    intr: dc.Interaction,
+    member: dc.Member,
+    name: Optional[dc.app_commands.Transform[str, JarName]] = None,
+) -> None:
     """Delete the jar of a member.
 
     Args:
         member: the owner of the jar
+        name: the name of the jar; or the default jar if empty
 
     """
-    jar = bot.data[intr].jars[member]
-    del bot.data[intr].jars[member]
-    await bot.respond(intr, f"Deleted the jar of %@ with {jar}!", member)
+    name = get_jar_name(name)
+    jars = bot.data[intr].jars
+    jar = jars[member, name]
+    del jars[member, name]
+    bot.data[intr].history.discard(member, name)
+    if not jars.of_member(member.id):  # the last jar of the member
+        bot.owners.remove(member.guild.id, member.id)
+    bot.scoreboards.mark(member.guild.id, member.id, name)
+    await bot.respond(
+        intr,
+        f"Deleted the {_jar(name)} of %@ with {jar}!",
+        member,
+    )
 
     reuse.set_member(None)
     bot.data[intr].dirty = True
@@ -1,21 +1,49 @@
+from __future__ import annotations
+
 import dataclasses
 import enum
+import itertools
+import time
+from typing import Any, Callable
 
 import discord as dc
 from discord.ext import tasks
 
+from . import tracing
 from .errors import GuildNotSetupError
+from .history import Histories
 
 
 @dataclasses.dataclass
 class ArgData:
     sync: bool
+    standby: bool
+    export_path: str | None
+    import_path: str | None
+    check: bool
+    repair: bool
 
 
 @dataclasses.dataclass
 class ConfigData:
     token: str
     host_contact: str
+    archive_after_days: float
+    scoreboard_window_seconds: float
+    trace_threshold_ms: float | None
+    lag_threshold_ms: float
+    api_host: str
+    api_port: int | None
+    guild_format: GuildFormat
+
+
+class GuildFormat(str, enum.Enum):
+    json = "json"
+    binary = "binary"
+    compressed = "compressed"  # binary, compressed with zlib
+
+    def __str__(self) -> str:
+        return self.value
 
 
 class Visibility(str, enum.Enum):
@@ -26,6 +54,16 @@ class Visibility(str, enum.Enum):
         return self.value
 
 
+class Schedule(str, enum.Enum):
+    never = "never"
+    daily = "daily"
+    weekly = "weekly"
+    monthly = "monthly"
+
+    def __str__(self) -> str:
+        return self.value
+
+
 @dataclasses.dataclass
 class JarData:
     currency: str
@@ -37,20 +75,78 @@ class JarData:
         return f"**{self.count} {self.currency}{s}**"
 
 
+DEFAULT_JAR = ""  # name of the jar of each member before jars had names
+
+
+def get_jar_name(name: str | None) -> str:
+    """Normalize the name of a jar; empty for the default jar."""
+    return name.strip().lower() if name else DEFAULT_JAR
+
+
 class Jars(dict):  # inherit from dict for simple serialization
-    def __getitem__(self, member: dc.Member) -> JarData:
-        return super().__getitem__(member.id)
+    """Jars keyed by (member id, jar name) with an index by jar name.
 
-    def __setitem__(self, member: dc.Member, jar: JarData) -> None:
-        return super().__setitem__(member.id, jar)
+    Items are accessed with (member, jar name) tuples. Remove jars with
+    ``del`` or ``pop`` only, so the index stays up to date.
+    """
 
-    def __delitem__(self, member: dc.Member) -> None:
-        return super().__delitem__(member.id)
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._index()
 
-    def __contains__(self, member: object) -> bool:
-        if not isinstance(member, dc.Member):
+    def __getitem__(self, key: tuple[dc.Member, str]) -> JarData:
+        member, name = key
+        return super().__getitem__((member.id, name))
+
+    def __setitem__(self, key: tuple[dc.Member, str], jar: JarData) -> None:
+        member, name = key
+        super().__setitem__((member.id, name), jar)
+        self._names.setdefault(name, {})[member.id] = jar
+
+    def __delitem__(self, key: tuple[dc.Member, str]) -> None:
+        member, name = key
+        self.pop((member.id, name))
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, tuple) or not isinstance(key[0], dc.Member):
             raise TypeError
-        return super().__contains__(member.id)
+        member, name = key
+        return super().__contains__((member.id, name))
+
+    def pop(self, key: tuple[int, str], *default: Any) -> Any:
+        """Remove the jar of a (member id, jar name) key."""
+        member_id, name = key
+        named = self._names.get(name, {})
+        if member_id not in named:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        del named[member_id]
+        if not named:
+            del self._names[name]
+        return super().pop(key)
+
+    def named(self, name: str) -> dict[int, JarData]:
+        """Return the jars with a name by member id; do not modify."""
+        return self._names.get(name, {})
+
+    def names(self) -> list[str]:
+        return sorted(self._names)
+
+    def member_ids(self) -> set[int]:
+        return {member_id for member_id, _ in dict.keys(self)}
+
+    def of_member(self, member_id: int) -> dict[str, JarData]:
+        return {
+            name: named[member_id]
+            for name, named in self._names.items()
+            if member_id in named
+        }
+
+    def _index(self) -> None:
+        self._names: dict[str, dict[int, JarData]] = {}
+        for (member_id, name), jar in dict.items(self):
+            self._names.setdefault(name, {})[member_id] = jar
 
 
 @dataclasses.dataclass
@@ -60,9 +156,32 @@ class GuildData:
     moderator_role_name: str  # store for error message in case role is changed
     responses_visibility: Visibility
     mentions_use: bool
+    schedule: Schedule = Schedule.never
+    decay: int = 100  # percentage of each jar removed per schedule period
+    schedule_period: int = 0  # last applied period; see jobs.get_period
+    scoreboard_channel_id: int = 0  # 0 = no scoreboard
+    scoreboard_message_id: int = 0
+    scoreboard_jar: str = DEFAULT_JAR  # name of the jars on the scoreboard
 
     def __post_init__(self) -> None:
-        self.dirty = False  # exclude from written data
+        # exclude from written data
+        self.generation = next(_generations)  # differs between loads
+        self.version = 0  # incremented on every change
+        self._dirty = False
+        self.history = Histories()  # written to a separate file
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, value: bool) -> None:
+        if value:
+            self.version += 1
+        self._dirty = value
+
+
+_generations = itertools.count(time.time_ns())  # unique across restarts
 
 
 class Guilds:
@@ -70,10 +189,19 @@ class Guilds:
 
     def __init__(self) -> None:
         self._guilds: dict[int, GuildData] = {}  # lazy load
+        self.on_unload: Callable[[int], None] | None = None
 
     def __getitem__(self, intr: dc.Interaction) -> GuildData:
         id_ = _assert_guild_id(intr)
+        if id_ in self._guilds:
+            return self._guilds[id_]
+        with tracing.span(intr, "load"):
+            return self.load(id_)
+
+    def load(self, id_: int) -> GuildData:
         if id_ not in self._guilds:
+            if not Guilds.jar_io.guild_exists(id_):
+                Guilds.jar_io.restore_guild(id_)  # transparent if archived
             try:
                 self._guilds[id_] = Guilds.jar_io.read_guild(id_)
             except FileNotFoundError as exc:
@@ -84,8 +212,29 @@ class Guilds:
         id_ = _assert_guild_id(intr)
         self._guilds[id_] = data
 
+    def get_loaded(self, id_: int) -> GuildData | None:
+        return self._guilds.get(id_)
+
+    def loaded_ids(self) -> list[int]:
+        return list(self._guilds)
+
+    def replace(self, id_: int, data: GuildData) -> None:
+        self._guilds[id_] = data
+
+    def unload(self, id_: int) -> None:
+        data = self._guilds.pop(id_, None)
+        if data and data.dirty:
+            Guilds.jar_io.write_guild(id_, data)
+        if data:
+            Guilds.jar_io.release_guild(data)  # e.g. before archiving
+        if self.on_unload:
+            self.on_unload(id_)
+
     @tasks.loop(seconds=10)
     async def write_loop(self) -> None:
+        self.flush()
+
+    def flush(self) -> None:
         for id_, data in self._guilds.items():
             if data.dirty:
                 Guilds.jar_io.write_guild(id_, data)
@@ -1,76 +1,80 @@
+import asyncio
 import functools
+import inspect
+import typing
 from typing import Any, Callable
 
 import discord as dc
 
-from . import reuse
+from . import reuse, tracing
+from .data import get_jar_name
 from .errors import (
     DuplicateJarError,
     GuildNotSetupError,
     NoJarError,
     NoSuchRoleError,
+    NotHostError,
     OwnJarAccessError,
 )
 
 
 def is_moderator(*, allow_setup: bool = False) -> Callable:
     def predicate(intr: dc.Interaction) -> bool:
-        if isinstance(intr.user, dc.User) or not intr.guild:
-            raise dc.app_commands.NoPrivateMessage
-
         try:
-            data = _get_guild_data(intr)
-        except GuildNotSetupError:
+            _get_moderators().check(intr)
+        except (GuildNotSetupError, NoSuchRoleError):
             if allow_setup:
                 return True
             raise
+        return True
 
-        mod_role = dc.utils.get(intr.guild.roles, id=data.moderator_role_id)
-        if not mod_role:
-            if allow_setup:
-                return True
-            raise NoSuchRoleError(data.moderator_role_name)
+    return _check("is_moderator", predicate)
 
-        if intr.user.get_role(mod_role.id) is not None:
-            return True
-        raise dc.app_commands.MissingRole(mod_role.mention)
 
-    return dc.app_commands.check(predicate)
+def is_host() -> Callable:
+    async def predicate(intr: dc.Interaction) -> bool:
+        app = intr.client.application or await intr.client.application_info()
+        if app.team:
+            host_ids = {member.id for member in app.team.members}
+        else:
+            host_ids = {app.owner.id}
+        if intr.user.id not in host_ids:
+            raise NotHostError
+        return True
+
+    return _check("is_host", predicate)
 
 
 def has_jar() -> Callable:
     def predicate(intr: dc.Interaction) -> bool:
         data = _get_guild_data(intr)
-        if (member := intr.namespace.member) is None:
-            member = reuse.get_member()
-        if member not in data.jars:
+        member = _get_member(intr)
+        if (member, _get_jar_name(intr)) not in data.jars:
             raise NoJarError
         return True
 
-    return dc.app_commands.check(predicate)
+    return _check("has_jar", predicate)
 
 
 def has_no_jar() -> Callable:
     def predicate(intr: dc.Interaction) -> bool:
         data = _get_guild_data(intr)
-        if (member := intr.namespace.member) is None:
-            member = reuse.get_member()
-        if member in data.jars:
+        member = _get_member(intr)
+        if (member, _get_jar_name(intr)) in data.jars:
             raise DuplicateJarError
         return True
 
-    return dc.app_commands.check(predicate)
+    return _check("has_no_jar", predicate)
 
 
 def is_not_own_jar() -> Callable:
     def predicate(intr: dc.Interaction) -> bool:
-        if (member := intr.namespace.member) is None:
-            member = reuse.get_member()
+        member = _get_member(intr)
         if intr.user.id == member.id:
             raise OwnJarAccessError
         return True
 
-    return dc.app_commands.check(predicate)
+    return _check("is_not_own_jar", predicate)
 
 
 def is_not_on_cooldown(*, seconds: float = 3.0) -> Callable:
@@ -91,17 +95,73 @@ def confirmation(describe_action: Callable) -> Callable:
                 view=_ConfirmView(intr, callback, **kwargs),
             )
 
+        # options are resolved in the globals of the wrapper; resolve them in
+        # the module of the command instead
+        wrapper.__signature__ = _resolve_signature(callback)  # type: ignore
         return wrapper
 
     return decorator
 
 
+def _resolve_signature(callback: Callable) -> inspect.Signature:
+    hints = typing.get_type_hints(callback)
+    signature = inspect.signature(callback)
+    return signature.replace(
+        parameters=[
+            parameter.replace(annotation=hints[parameter.name])
+            for parameter in signature.parameters.values()
+        ],
+    )
+
+
+def _check(name: str, predicate: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(predicate):
+
+        async def traced(intr: dc.Interaction) -> bool:
+            with tracing.span(intr, f"check:{name}"):
+                return await predicate(intr)
+
+    else:
+
+        def traced(intr: dc.Interaction) -> bool:  # type: ignore[misc]
+            with tracing.span(intr, f"check:{name}"):
+                return predicate(intr)
+
+    return dc.app_commands.check(traced)
+
+
+def _get_member(intr: dc.Interaction) -> dc.Member:
+    member = intr.namespace.member
+    if member is None:
+        return reuse.get_member()
+    if isinstance(member, str):  # JarOwner option is transformed after checks
+        if not (member := _get_owners().resolve(intr, member)):
+            raise NoJarError
+    return member
+
+
+def _get_jar_name(intr: dc.Interaction) -> str:
+    return get_jar_name(intr.namespace.name)  # not transformed before checks
+
+
 def _get_guild_data(intr: dc.Interaction) -> Any:
     from .bot import bot  # prevent circular import
 
     return bot.data[intr]
 
 
+def _get_moderators() -> Any:
+    from .bot import bot  # prevent circular import
+
+    return bot.moderators
+
+
+def _get_owners() -> Any:
+    from .bot import bot  # prevent circular import
+
+    return bot.owners
+
+
 class _ConfirmView(dc.ui.View):
     def __init__(
         self,
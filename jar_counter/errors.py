@@ -33,6 +33,10 @@ class DuplicateJarError(CheckFailure):
     pass
 
 
+class AmbiguousMemberError(CheckFailure):
+    pass
+
+
 class OwnJarAccessError(CheckFailure):
     pass
 
@@ -41,6 +45,16 @@ class NoReuseMemberError(ValueError, CheckFailure):
     pass
 
 
+class NotHostError(CheckFailure):
+    pass
+
+
+class OverloadedError(CheckFailure):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__()
+        self.retry_after = retry_after
+
+
 def get_error_message(exc: AppCommandError) -> str:
     for error_subtype, get_message in _messages.items():
         if issubclass(type(exc), error_subtype):
@@ -80,6 +94,13 @@ def _get_command_on_cooldown_message(
     )
 
 
+def _get_overloaded_message(exc: OverloadedError) -> str:
+    return (
+        f"The bot is busy right now. Try again after "
+        f"{max(exc.retry_after, 1.0):.0f} seconds."
+    )
+
+
 def _get_check_failure_message(exc: CheckFailure) -> str | None:
     messages = {
         GuildNotSetupError: (
@@ -95,8 +116,13 @@ def _get_check_failure_message(exc: CheckFailure) -> str | None:
             "The specified member has no jar. Use `/jar create` to create one."
         ),
         DuplicateJarError: "The specified member already has a jar.",
+        AmbiguousMemberError: (
+            f"Several members with a jar match `{exc}`. Pick one of the "
+            "suggestions or type the full name."
+        ),
         OwnJarAccessError: "This command may not be called for your own jar.",
         NoReuseMemberError: _get_no_reuse_member_error_message(),
+        NotHostError: "This command may only be called by the bot host.",
     }
 
     for error_subtype, msg in messages.items():
@@ -135,9 +161,10 @@ _messages = {
     NoPrivateMessage: _get_no_private_message_message,
     MissingRole: _get_missing_role_message,
     CommandOnCooldown: _get_command_on_cooldown_message,
+    OverloadedError: _get_overloaded_message,
     # Due to inheritance hierarchy this must be inserted after (if present):
     # NoPrivateMessage, MissingRole, MissingAnyRole, MissingPermissions,
-    # BotMissingPermissions, CommandOnCooldown
+    # BotMissingPermissions, CommandOnCooldown, OverloadedError
     CheckFailure: _get_check_failure_message,
     CommandSignatureMismatch: (_get_command_signature_mismatch_message),
 }
@@ -22,6 +22,15 @@ def write_needs_sync_message() -> None:
     )
 
 
+def write_lease_held_message() -> None:
+    _write_error(
+        "Another instance of the bot holds the lease on the 'data' directory. "
+        "Stop it first; a crashed instance releases the lease on its own. "
+        "To start a standby that takes over once the other instance stops, "
+        "pass the '--standby' flag.",
+    )
+
+
 def _write_error(message: str) -> None:
     sys.stderr.write(f"{message}\n")
     sys.stderr.flush()
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Callable, Iterator
+
+from . import jar_io
+
+
+if TYPE_CHECKING:
+    from .data import Guilds
+
+
+# Exports are newline delimited JSON with one record per line:
+# {"type": "guild", "id": <guild id>, "guild": <guild file>,
+#  "history": <base64> | null}; "type" is missing in older exports
+# {"type": "archived_guild", ...}: like "guild", for data/archive
+# {"type": "archived_jars", "id": <guild id>, "jars": <archived jars>}
+# {"type": "departures", "departures": <departures file>}
+
+EXPORT_DIR = Path("exports")  # used by /jar export and for repairs
+
+_PROGRESS_STEP = 1000
+
+
+def export_guilds(
+    path: str | Path,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Export all guilds of the data directory while the bot is not running.
+
+    Archived guilds and jars and pending departures are exported as well.
+
+    Returns:
+        the number of exported guilds, archived ones included
+
+    """
+    with _Output(path) as file:
+        count = 0
+        for count, line in enumerate(_iter_lines(None), 1):
+            file.write(line)
+            _report(progress, count)
+        file.writelines(_iter_archive_lines())
+    return count
+
+
+async def export_guilds_live(
+    path: str | Path,
+    guilds: Guilds,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Export all guilds while the bot is running.
+
+    Loaded guilds are taken from memory, others from disk. Each guild is
+    written in one step of the event loop, so it never interleaves with a
+    flush of ``Guilds.write_loop``. Departures are read from disk, so flush
+    them first.
+
+    Returns:
+        the number of exported guilds, archived ones included
+
+    """
+    with _Output(path) as file:
+        count = 0
+        for count, line in enumerate(_iter_lines(guilds), 1):
+            file.write(line)
+            _report(progress, count)
+            await asyncio.sleep(0)  # let commands run between guilds
+        for line in _iter_archive_lines():
+            file.write(line)
+            await asyncio.sleep(0)
+    return count
+
+
+def import_guilds(
+    path: str | Path,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Import all guilds of an export into the data directory.
+
+    Existing guilds with the same id are overwritten, as are archived data and
+    departures if exported. Must not be called while the bot is running.
+
+    Returns:
+        the number of imported guilds, archived ones included
+
+    Raises:
+        ValueError: a record of unknown type
+
+    """
+    count = 0
+    with open_export(path, "rt") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            type_ = entry.get("type", "guild")
+            if type_ == "departures":
+                jar_io.write_departures(entry["departures"])
+                continue
+            if type_ == "archived_jars":
+                jar_io.write_archived_jars(int(entry["id"]), entry["jars"])
+                continue
+
+            if type_ == "guild":
+                write = jar_io.write_raw_guild
+            elif type_ == "archived_guild":
+                write = jar_io.write_archived_guild
+            else:
+                raise ValueError(f"unknown record type {type_!r}")
+            history = entry["history"]
+            write(
+                int(entry["id"]),
+                entry["guild"],
+                base64.b64decode(history) if history else None,
+            )
+            count += 1
+            _report(progress, count)
+    return count
+
+
+def _iter_lines(guilds: Guilds | None) -> Iterator[str]:
+    ids = set(jar_io.guild_ids())
+    if guilds:
+        ids.update(guilds.loaded_ids())
+
+    for id_ in sorted(ids):
+        data = guilds.get_loaded(id_) if guilds else None
+        if data:
+            guild, history = jar_io.dump_guild(data)
+        else:
+            try:
+                guild, history = jar_io.read_raw_guild(id_)
+            except FileNotFoundError:
+                ids.discard(id_)
+                continue  # archived in the meantime
+        yield _guild_line("guild", id_, guild, history)
+
+    for id_ in jar_io.archived_guild_ids():
+        if id_ in ids:
+            continue  # archived in the meantime; exported above
+        try:
+            guild, history = jar_io.read_archived_guild(id_)
+        except FileNotFoundError:
+            continue  # restored in the meantime
+        yield _guild_line("archived_guild", id_, guild, history)
+
+
+def _iter_archive_lines() -> Iterator[str]:
+    for id_ in jar_io.archived_jars_ids():
+        if jars := jar_io.read_archived_jars(id_):
+            entry = {"type": "archived_jars", "id": id_, "jars": jars}
+            yield json.dumps(entry) + "\n"
+    entry = {"type": "departures", "departures": jar_io.read_departures()}
+    yield json.dumps(entry) + "\n"
+
+
+def _guild_line(
+    type_: str,
+    id_: int,
+    guild: dict,
+    history: bytes | None,
+) -> str:
+    entry = {
+        "type": type_,
+        "id": id_,
+        "guild": guild,
+        "history": base64.b64encode(history).decode() if history else None,
+    }
+    return json.dumps(entry) + "\n"
+
+
+def _report(progress: Callable[[int], None] | None, count: int) -> None:
+    if progress and count % _PROGRESS_STEP == 0:
+        progress(count)
+
+
+def open_export(path: str | Path, mode: str) -> IO[str]:
+    """Open an export, gzipped if ``path`` ends on ``.gz``."""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode)  # type: ignore[return-value]
+    return open(path, mode[0])  # noqa: SIM115, PTH123
+
+
+class _Output:
+    """Write to a temporary file that replaces ``path`` once complete."""
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path)
+        self._tmp_path = self._path.with_name(f".tmp_{self._path.name}")
+        self._file: IO[str]
+
+    def __enter__(self) -> IO[str]:
+        self._file = open_export(self._tmp_path, "wt")
+        return self._file
+
+    def __exit__(self, exc_type: object, *_: object) -> None:
+        self._file.close()
+        if exc_type:
+            self._tmp_path.unlink(missing_ok=True)
+        else:
+            os.replace(self._tmp_path, self._path)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import base64
+import dataclasses
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+from . import export, history, jar_io
+from .data import GuildData, JarData, Schedule, Visibility, get_jar_name
+
+
+_SNOWFLAKE_LIMIT = 2**64
+
+
+@dataclasses.dataclass
+class _Result:
+    id_: int
+    errors: list[str]  # file can not be loaded; repaired from an export
+    fixable: list[str]  # file can be loaded; repaired in place
+
+
+def run(*, repair: bool) -> bool:
+    """Check all guild files of the data directory in parallel.
+
+    Returns:
+        whether all guild files are valid after an optional repair
+
+    """
+    ids = jar_io.guild_ids()
+    chunksize = max(1, len(ids) // ((os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor() as executor:
+        results = [
+            result
+            for result in executor.map(_check, ids, chunksize=chunksize)
+            if result.errors or result.fixable
+        ]
+
+    for result in results:
+        name = jar_io.guild_path(result.id_).name
+        for problem in result.errors + result.fixable:
+            _write(f"{name}: {problem}")
+    _write(f"Checked {len(ids)} guilds, {len(results)} with problems.")
+
+    if not repair or not results:
+        return not results
+
+    unrepaired = _repair_from_exports(
+        {result.id_ for result in results if result.errors},
+    )
+    for result in results:
+        if result.id_ not in unrepaired:
+            _repair_in_place(result.id_)
+
+    for id_ in sorted(unrepaired):
+        name = jar_io.guild_path(id_).name
+        _write(f"{name}: no valid export found, repair manually")
+    _write(f"Repaired {len(results) - len(unrepaired)} guilds.")
+    return not unrepaired
+
+
+def validate(json_dict: object, history: bytes | None) -> _Result:
+    """Validate a guild file and its history against ``GuildData``."""
+    result = _Result(0, [], [])
+    if not isinstance(json_dict, dict):
+        result.errors.append("not a JSON object")
+        return result
+
+    fields = {field.name: field for field in dataclasses.fields(GuildData)}
+    for name in json_dict.keys() - fields.keys():
+        result.errors.append(f"unknown entry '{name}'")
+    for name, field in fields.items():
+        if name not in json_dict and field.default is dataclasses.MISSING:
+            result.errors.append(f"missing entry '{name}'")
+
+    if not _is_snowflake(json_dict.get("moderator_role_id", 1)):
+        result.errors.append("invalid moderator role id")
+    if not isinstance(json_dict.get("moderator_role_name", ""), str):
+        result.errors.append("invalid moderator role name")
+    visibilities = {v.value for v in Visibility}
+    if json_dict.get("responses_visibility", "visible") not in visibilities:
+        result.errors.append("invalid responses visibility")
+    if not isinstance(json_dict.get("mentions_use", True), bool):
+        result.errors.append("invalid mentions use")
+    if json_dict.get("schedule", "never") not in {s.value for s in Schedule}:
+        result.errors.append("invalid schedule")
+    decay = json_dict.get("decay", 100)
+    if not _is_int(decay) or not 1 <= decay <= 100:
+        result.errors.append("invalid decay")
+    if not _is_int(json_dict.get("schedule_period", 0)):
+        result.errors.append("invalid schedule period")
+    for name in ("scoreboard_channel_id", "scoreboard_message_id"):
+        if not _is_int(json_dict.get(name, 0)):
+            result.errors.append(f"invalid {name.replace('_', ' ')}")
+    if not isinstance(json_dict.get("scoreboard_jar", ""), str):
+        result.errors.append("invalid scoreboard jar")
+
+    jars = json_dict.get("jars", {})
+    if not isinstance(jars, dict):
+        result.errors.append("jars are not a JSON object")
+        jars = {}
+    for key, jar in jars.items():
+        _validate_jar(key, jar, result)
+
+    if history:
+        keys = {jar_io.split_jar_key(key) for key in jars}
+        _validate_history(history, keys, result)
+    return result
+
+
+def _check(id_: int) -> _Result:
+    try:
+        json_dict, history = jar_io.read_raw_guild(id_)
+    except (OSError, UnicodeDecodeError, ValueError) as exc:
+        return _Result(id_, [f"unreadable ({exc})"], [])
+
+    result = validate(json_dict, history)
+    result.id_ = id_
+    return result
+
+
+def _validate_jar(key: str, jar: object, result: _Result) -> None:
+    id_, name = jar_io.split_jar_key(key)
+    if not id_.isdecimal() or not _is_snowflake(int(id_)):
+        result.errors.append(f"invalid member id '{id_}'")
+    if name != get_jar_name(name):
+        result.errors.append(f"invalid jar name '{name}'")
+
+    owner = _describe_jar(id_, name)
+    fields = {field.name for field in dataclasses.fields(JarData)}
+    if not isinstance(jar, dict) or jar.keys() != fields:
+        result.errors.append(f"invalid jar of {owner}")
+        return
+
+    if not isinstance(jar["currency"], str):
+        result.errors.append(f"invalid currency of {owner}")
+    if not isinstance(jar["suffix"], bool):
+        result.errors.append(f"invalid suffix of {owner}")
+    count = jar["count"]
+    if not _is_int(count):
+        result.errors.append(f"invalid count of {owner}")
+    elif count < 0:
+        result.fixable.append(f"negative count of {owner}")
+
+
+def _validate_history(buffer: bytes, jar_keys: set, result: _Result) -> None:
+    histories, complete = history.loads(buffer)
+    if not complete:
+        result.fixable.append("truncated history")
+
+    for member_id, name in histories:
+        if (str(member_id), name) not in jar_keys:
+            owner = _describe_jar(str(member_id), name)
+            result.fixable.append(f"orphaned history of {owner}")
+
+
+def _describe_jar(id_: str, name: str) -> str:
+    return f"member {id_}, jar '{name}'" if name else f"member {id_}"
+
+
+def _repair_in_place(id_: int) -> None:
+    data = jar_io.read_guild(id_)  # drops truncated history records
+    for jar in data.jars.values():
+        jar.count = max(jar.count, 0)
+    for key in data.history.keys() - data.jars.keys():
+        del data.history[key]
+    jar_io.write_guild(id_, data)
+
+
+def _repair_from_exports(ids: set[int]) -> set[int]:
+    """Restore guilds from the latest valid export containing them.
+
+    Returns:
+        the ids of guilds without a valid export
+
+    """
+    missing = set(ids)
+    exports = sorted(
+        export.EXPORT_DIR.glob("*.ndjson*"),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in exports:
+        if not missing:
+            break
+        for entry in _iter_export(path, missing):
+            history = entry["history"]
+            history = base64.b64decode(history) if history else None
+            if validate(entry["guild"], history).errors:
+                continue
+            jar_io.write_raw_guild(entry["id"], entry["guild"], history)
+            missing.discard(entry["id"])
+            _write(f"restored guild {entry['id']} from {path}")
+    return missing
+
+
+def _iter_export(path: Path, ids: set[int]) -> Iterator[dict]:
+    try:
+        with export.open_export(path, "rt") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(entry, dict):
+                    continue
+                if entry.get("type", "guild") == "guild" and (
+                    entry.get("id") in ids
+                ):
+                    yield entry
+    except (OSError, EOFError):  # unreadable or truncated export
+        return
+
+
+def _is_snowflake(value: object) -> bool:
+    return _is_int(value) and 0 < value < _SNOWFLAKE_LIMIT  # type: ignore
+
+
+def _is_int(value: object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _write(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
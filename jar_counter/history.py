@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import datetime
+import struct
+import time
+from array import array
+from typing import TYPE_CHECKING, Iterator
+
+
+if TYPE_CHECKING:
+    import discord as dc
+
+
+RECENT_SIZE = 16  # individual changes kept before folding into days
+DAYS_SIZE = 28  # days of folded changes kept
+
+_SECONDS_PER_DAY = 60 * 60 * 24
+_DELTA_LIMIT = 2**63 - 1
+_EPOCH = datetime.date(1970, 1, 1)
+_HEADER = struct.Struct("<QHH")  # member id, recent start, recent length
+_NAMED = b"\xff" * 8  # starts the records of named jars; not a member id
+_NAME_LENGTH = struct.Struct("<B")
+
+
+class JarHistory:
+    """Constant size time series of the changes of a jar.
+
+    The latest changes are kept individually in a ring buffer. Changes pushed
+    out of it are summed up per day in a second ring buffer covering the last
+    ``DAYS_SIZE`` days.
+    """
+
+    RECORD_SIZE = _HEADER.size + (RECENT_SIZE + DAYS_SIZE) * (4 + 8)
+
+    __slots__ = (
+        "_recent_times",
+        "_recent_deltas",
+        "_recent_start",
+        "_recent_len",
+        "_days",
+        "_day_deltas",
+    )
+
+    def __init__(self) -> None:
+        self._recent_times = array("I", bytes(4 * RECENT_SIZE))
+        self._recent_deltas = array("q", bytes(8 * RECENT_SIZE))
+        self._recent_start = 0
+        self._recent_len = 0
+        self._days = array("I", bytes(4 * DAYS_SIZE))  # days since epoch
+        self._day_deltas = array("q", bytes(8 * DAYS_SIZE))
+
+    def record(self, delta: int, timestamp: int | None = None) -> None:
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        if self._recent_len == RECENT_SIZE:
+            self._fold(
+                self._recent_times[self._recent_start],
+                self._recent_deltas[self._recent_start],
+            )
+            self._recent_start = (self._recent_start + 1) % RECENT_SIZE
+            self._recent_len -= 1
+
+        i = (self._recent_start + self._recent_len) % RECENT_SIZE
+        self._recent_times[i] = timestamp
+        self._recent_deltas[i] = _clamp(delta)
+        self._recent_len += 1
+
+    def daily(self, days: int, now: int | None = None) -> dict[int, int]:
+        """Return the net change per day for the last ``days`` days."""
+        if now is None:
+            now = int(time.time())
+        first = now // _SECONDS_PER_DAY - days + 1
+
+        totals: dict[int, int] = {}
+        for day, delta in zip(self._days, self._day_deltas):
+            if day >= first and delta:
+                totals[day] = totals.get(day, 0) + delta
+        for j in range(self._recent_len):
+            i = (self._recent_start + j) % RECENT_SIZE
+            day = self._recent_times[i] // _SECONDS_PER_DAY
+            if day >= first:
+                totals[day] = totals.get(day, 0) + self._recent_deltas[i]
+        return dict(sorted(totals.items()))
+
+    def to_bytes(self, member_id: int) -> bytes:
+        return b"".join(
+            (
+                _HEADER.pack(member_id, self._recent_start, self._recent_len),
+                self._recent_times.tobytes(),
+                self._recent_deltas.tobytes(),
+                self._days.tobytes(),
+                self._day_deltas.tobytes(),
+            ),
+        )
+
+    @classmethod
+    def from_bytes(cls, record: bytes) -> tuple[int, JarHistory]:
+        history = cls()
+        member_id, history._recent_start, history._recent_len = (
+            _HEADER.unpack_from(record)
+        )
+        offset = _HEADER.size
+        for values in (
+            history._recent_times,
+            history._recent_deltas,
+            history._days,
+            history._day_deltas,
+        ):
+            size = len(values) * values.itemsize
+            values[:] = array(values.typecode, record[offset : offset + size])
+            offset += size
+        return member_id, history
+
+    def _fold(self, timestamp: int, delta: int) -> None:
+        day = timestamp // _SECONDS_PER_DAY
+        i = day % DAYS_SIZE
+        if self._days[i] != day:
+            self._days[i] = day
+            self._day_deltas[i] = 0
+        self._day_deltas[i] = _clamp(self._day_deltas[i] + delta)
+
+
+class Histories(dict):  # keyed by (member id, jar name) like Jars
+    def record(self, member: dc.Member, name: str, delta: int) -> None:
+        self.record_id(member.id, name, delta)
+
+    def record_id(self, member_id: int, name: str, delta: int) -> None:
+        history = self.get((member_id, name))
+        if history is None:
+            history = self[member_id, name] = JarHistory()
+        history.record(delta)
+
+    def discard(self, member: dc.Member, name: str) -> None:
+        self.pop((member.id, name), None)
+
+    def daily(
+        self,
+        member: dc.Member,
+        name: str,
+        days: int,
+    ) -> dict[int, int]:
+        history = self.get((member.id, name))
+        if history is None:
+            return {}
+        return history.daily(days)
+
+
+def dumps(histories: Histories) -> bytes:
+    """Encode histories.
+
+    Records of default jars come first, so files from before named jars stay
+    valid. Records of named jars follow a marker, each prefixed by its name.
+    """
+    records = []
+    named = []
+    for (member_id, name), history in histories.items():
+        if not name:  # default jar
+            records.append(history.to_bytes(member_id))
+        else:
+            encoded = name.encode()
+            named += (
+                _NAME_LENGTH.pack(len(encoded)),
+                encoded,
+                history.to_bytes(member_id),
+            )
+    if named:
+        records.append(_NAMED)
+    return b"".join(records + named)
+
+
+def loads(buffer: bytes) -> tuple[Histories, bool]:
+    """Decode histories written by ``dumps``.
+
+    Returns:
+        the histories and whether the buffer was complete; a truncated last
+        record is dropped
+
+    """
+    histories = Histories()
+    offset = 0
+    for member_id, name, history, offset in _iter_records(buffer):
+        histories[member_id, name] = history
+    return histories, offset == len(buffer)
+
+
+def _iter_records(buffer: bytes) -> Iterator[tuple[int, str, JarHistory, int]]:
+    size = JarHistory.RECORD_SIZE
+    offset = 0
+    while buffer[offset : offset + len(_NAMED)] != _NAMED:
+        if offset + size > len(buffer):
+            return
+        member_id, history = JarHistory.from_bytes(
+            buffer[offset : offset + size],
+        )
+        offset += size
+        yield member_id, "", history, offset
+
+    offset += len(_NAMED)
+    while offset < len(buffer):
+        (length,) = _NAME_LENGTH.unpack_from(buffer, offset)
+        start = offset + _NAME_LENGTH.size + length
+        if start + size > len(buffer):
+            return
+        name = buffer[offset + _NAME_LENGTH.size : start].decode(
+            errors="replace",  # becomes an orphan; see fsck
+        )
+        member_id, history = JarHistory.from_bytes(buffer[start : start + size])
+        offset = start + size
+        yield member_id, name, history, offset
+
+
+def format_day(day: int) -> str:
+    return (_EPOCH + datetime.timedelta(days=day)).isoformat()
+
+
+def _clamp(delta: int) -> int:
+    return max(-_DELTA_LIMIT, min(delta, _DELTA_LIMIT))
@@ -1,24 +1,81 @@
+from __future__ import annotations
+
 import argparse
+import base64
 import configparser
 import dataclasses
+import gzip
 import json
 import os
+import shutil
 from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from . import history, packed
+from .data import ArgData, ConfigData, GuildData, GuildFormat, JarData, Jars
+from .history import Histories, JarHistory
 
-from .data import ArgData, ConfigData, GuildData, JarData, Jars
+
+_guild_format = GuildFormat.json
+_fence: Callable[[], None] | None = None
 
 
 def read_args() -> ArgData:
     python = "py" if os.name == "nt" else "python3"  # "nt" is Windows
-    parser = argparse.ArgumentParser(usage=f"{python} -m jar_counter [-h] [-s]")
-    parser.add_argument(
+    parser = argparse.ArgumentParser(
+        usage=(
+            f"{python} -m jar_counter "
+            "[-h] [-s | -w | -e FILE | -i FILE | -c | -r]"
+        ),
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
         "-s",
         "--sync",
         action="store_true",
         help=("sync commands and exit"),
     )
+    group.add_argument(
+        "-w",
+        "--standby",
+        action="store_true",
+        help=("keep data loaded and take over once the running instance stops"),
+    )
+    group.add_argument(
+        "-e",
+        "--export",
+        metavar="FILE",
+        help=("export all guilds to FILE (gzipped if ending on .gz) and exit"),
+    )
+    group.add_argument(
+        "-i",
+        "--import",
+        metavar="FILE",
+        dest="import_",
+        help=("import all guilds from an exported FILE and exit"),
+    )
+    group.add_argument(
+        "-c",
+        "--check",
+        action="store_true",
+        help=("check all guild files for errors and exit"),
+    )
+    group.add_argument(
+        "-r",
+        "--repair",
+        action="store_true",
+        help=("check all guild files, repair errors from exports and exit"),
+    )
 
-    return ArgData(parser.parse_args().sync)
+    args = parser.parse_args()
+    return ArgData(
+        args.sync,
+        args.standby,
+        args.export,
+        args.import_,
+        args.check,
+        args.repair,
+    )
 
 
 def read_config() -> ConfigData:
@@ -27,33 +84,471 @@ def read_config() -> ConfigData:
 
     token = parser["mandatory"]["token"]
     host_contact = parser["optional"]["contact"]
-    return ConfigData(token, host_contact)
+    archive_after_days = parser["optional"].getfloat(
+        "archive_after_days",
+        fallback=7.0,
+    )
+    scoreboard_window_seconds = parser["optional"].getfloat(
+        "scoreboard_window_seconds",
+        fallback=30.0,
+    )
+    trace_threshold_ms = parser["optional"].get("trace_threshold_ms")
+    lag_threshold_ms = parser["optional"].getfloat(
+        "lag_threshold_ms",
+        fallback=500.0,
+    )
+    api_host = parser["optional"].get("api_host") or "127.0.0.1"
+    api_port = parser["optional"].get("api_port")
+    guild_format = parser["optional"].get("guild_format") or "json"
+    return ConfigData(
+        token,
+        host_contact,
+        archive_after_days,
+        scoreboard_window_seconds,
+        float(trace_threshold_ms) if trace_threshold_ms else None,
+        lag_threshold_ms,
+        api_host,
+        int(api_port) if api_port else None,
+        GuildFormat(guild_format),
+    )
+
+
+def set_guild_format(guild_format: GuildFormat) -> None:
+    """Set the format guild files are written in. Both are always read."""
+    global _guild_format  # noqa: PLW0603
+    _guild_format = guild_format
+
+
+def set_fence(fence: Callable[[], None] | None) -> None:
+    """Set a check called before every write, e.g. ``Lease.check``."""
+    global _fence  # noqa: PLW0603
+    _fence = fence
+
+
+def read_guild(id_: int, *, lazy: bool = True) -> GuildData:
+    """Read a guild file in either format.
 
+    Jars of a packed file are decoded on first use, unless ``lazy`` is False.
+    """
+    path = _get_guild_path(id_)
+    if path.suffix == packed.SUFFIX:
+        data = packed.read(path) if lazy else packed.loads(path.read_bytes())
+    else:
+        with path.open() as file:
+            data = _from_json_dict(json.load(file))
 
-def read_guild(id_: int) -> GuildData:
-    with _get_guild_path(id_).open() as file:
-        json_dict = json.load(file)
-        jars = Jars(
-            {
-                int(id_): JarData(**jar)
-                for id_, jar in json_dict.pop("jars").items()
-            },
-        )
-        return GuildData(jars, **json_dict)
+    data.history = read_history(id_)
+    return data
+
+
+def read_member_ids(id_: int) -> set[int]:
+    """Read the ids of the members owning jars in a guild file.
+
+    Only the ids of a packed file are read, no jars or history.
+    """
+    path = _get_guild_path(id_)
+    if path.suffix == packed.SUFFIX:
+        return packed.read(path).jars.member_ids()
+    with path.open() as file:
+        return _from_json_dict(json.load(file)).jars.member_ids()
 
 
 def write_guild(id_: int, data: GuildData) -> None:
-    with _get_guild_path(id_).open("w") as file:
-        json.dump(
-            dataclasses.asdict(data),
-            file,
-            indent=4,
-        )
+    _write_guild_file(id_, data)
+    if data.history or _get_history_path(id_).exists():
+        write_history(id_, data.history)
+
+
+def release_guild(data: GuildData) -> None:
+    """Release the file of a guild with jars not decoded yet."""
+    if isinstance(data.jars, packed.LazyJars):
+        data.jars.detach()
+
+
+def _write_guild_file(id_: int, data: GuildData) -> None:
+    _check_fence()
+    content = None
+    if _guild_format != GuildFormat.json:
+        try:
+            content = packed.dumps(
+                data,
+                compress=_guild_format == GuildFormat.compressed,
+            )
+        except ValueError:
+            pass  # a number too large for the packed format; write JSON
+
+    json_path, packed_path = _get_guild_paths(id_)
+    path, other_path = (
+        (packed_path, json_path) if content else (json_path, packed_path)
+    )
+
+    # write to a temporary file first so a crash never leaves a truncated file
+    tmp_path = path.with_suffix(f"{path.suffix}.tmp")
+    if content:
+        tmp_path.write_bytes(content)
+    else:
+        with tmp_path.open("w") as file:
+            json.dump(
+                _to_json_dict(data),
+                file,
+                indent=4,
+            )
+    os.replace(tmp_path, path)
+    other_path.unlink(missing_ok=True)  # written in the previous format
+
+
+def format_jar_key(member_id: int, name: str) -> str:
+    """Return the JSON key of a jar; the member id for default jars."""
+    return f"{member_id}/{name}" if name else str(member_id)
+
+
+def split_jar_key(key: str) -> tuple[str, str]:
+    """Split the JSON key of a jar into member id and jar name."""
+    member_id, _, name = key.partition("/")
+    return member_id, name
+
+
+def _parse_jar_key(key: str) -> tuple[int, str]:
+    member_id, name = split_jar_key(key)
+    return int(member_id), name
+
+
+def _from_json_dict(json_dict: dict) -> GuildData:
+    jars = Jars(
+        {
+            _parse_jar_key(key): JarData(**jar)
+            for key, jar in json_dict["jars"].items()
+        },
+    )
+    settings = dict(json_dict)
+    del settings["jars"]
+    return GuildData(jars, **settings)
+
+
+def _to_json_dict(data: GuildData) -> dict:
+    json_dict = dataclasses.asdict(data)
+    json_dict["jars"] = {
+        format_jar_key(*key): jar for key, jar in json_dict["jars"].items()
+    }
+    return json_dict
+
+
+def guild_path(id_: int) -> Path:
+    return _get_guild_path(id_)
+
+
+def guild_ids() -> list[int]:
+    return list(_find_guild_ids())
+
+
+def guild_mtimes() -> dict[int, tuple[int, int]]:
+    """Return the modification times of all guild and history files."""
+    mtimes = {}
+    for id_ in _find_guild_ids():
+        if mtime := guild_mtime(id_):
+            mtimes[id_] = mtime
+    return mtimes
+
+
+def guild_mtime(id_: int) -> tuple[int, int] | None:
+    """Return the modification times of a guild and its history file."""
+    try:
+        guild_mtime = _get_guild_path(id_).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    try:
+        history_mtime = _get_history_path(id_).stat().st_mtime_ns
+    except FileNotFoundError:
+        history_mtime = 0
+    return guild_mtime, history_mtime
+
+
+def _find_guild_ids() -> set[int]:
+    ids = set()
+    for path in _get_data_dir().glob("guild_*"):
+        id_ = path.stem[len("guild_") :]
+        if path.suffix in (".json", packed.SUFFIX) and id_.isdecimal():
+            ids.add(int(id_))
+    return ids
+
+
+def dump_guild(data: GuildData) -> tuple[dict, bytes]:
+    """Return the written representation of a guild and its history."""
+    return _to_json_dict(data), history.dumps(data.history)
+
+
+def read_raw_guild(id_: int) -> tuple[dict, bytes | None]:
+    """Return a guild file as JSON object and its history file."""
+    path = _get_guild_path(id_)
+    if path.suffix == packed.SUFFIX:
+        json_dict = _to_json_dict(packed.loads(path.read_bytes()))
+    else:
+        with path.open() as file:
+            json_dict = json.load(file)
+    try:
+        history = _get_history_path(id_).read_bytes()
+    except FileNotFoundError:
+        history = None
+    return json_dict, history
+
+
+def write_raw_guild(id_: int, json_dict: dict, history: bytes | None) -> None:
+    _write_guild_file(id_, _from_json_dict(json_dict))
+
+    if history:
+        _write_history_file(id_, history)
+    else:
+        _get_history_path(id_).unlink(missing_ok=True)
+
+
+def read_history(id_: int) -> Histories:
+    try:
+        buffer = _get_history_path(id_).read_bytes()
+    except FileNotFoundError:
+        return Histories()
+    histories, _ = history.loads(buffer)  # drops a truncated last record
+    return histories
+
+
+def write_history(id_: int, histories: Histories) -> None:
+    _check_fence()
+    _write_history_file(id_, history.dumps(histories))
+
+
+def _write_history_file(id_: int, content: bytes) -> None:
+    # replace the file like _write_guild_file; a crash while writing in place
+    # would lose all records after the one being written
+    path = _get_history_path(id_)
+    tmp_path = path.with_suffix(f"{path.suffix}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def guild_exists(id_: int) -> bool:
+    return any(path.exists() for path in _get_guild_paths(id_))
+
+
+def archive_guild(id_: int) -> None:
+    _check_fence()
+    for path in (*_get_guild_paths(id_), _get_history_path(id_)):
+        if path.exists():
+            _compress(path, _get_archive_path(path.name))
+
+
+def restore_guild(id_: int) -> bool:
+    _check_fence()
+    restored = False
+    for path in (*_get_guild_paths(id_), _get_history_path(id_)):
+        archive_path = _get_archive_path(path.name)
+        if archive_path.exists():
+            _decompress(archive_path, path)
+            restored = True
+    return restored
+
+
+def archived_guild_ids() -> list[int]:
+    ids = set()
+    for path in _get_archive_dir().glob("guild_*.gz"):
+        name = Path(path.stem)  # e.g. guild_1.json
+        id_ = name.stem[len("guild_") :]
+        if name.suffix in (".json", packed.SUFFIX) and id_.isdecimal():
+            ids.add(int(id_))
+    return sorted(ids)
+
+
+def read_archived_guild(id_: int) -> tuple[dict, bytes | None]:
+    """Return an archived guild file as JSON object and its history file."""
+    json_path, packed_path = _get_guild_paths(id_)
+    json_archive = _get_archive_path(json_path.name)
+    packed_archive = _get_archive_path(packed_path.name)
+    if packed_archive.exists() and not (
+        json_archive.exists()  # left over by a crash; see _get_guild_path
+        and json_archive.stat().st_mtime_ns > packed_archive.stat().st_mtime_ns
+    ):
+        with gzip.open(packed_archive, "rb") as file:
+            json_dict = _to_json_dict(packed.loads(file.read()))
+    else:
+        with gzip.open(json_archive, "rt") as file:
+            json_dict = json.load(file)
+    try:
+        with gzip.open(_get_archive_path(_get_history_path(id_).name)) as file:
+            history = file.read()
+    except FileNotFoundError:
+        history = None
+    return json_dict, history
+
+
+def write_archived_guild(
+    id_: int,
+    json_dict: dict,
+    history: bytes | None,
+) -> None:
+    """Write an archived guild, restored once loaded; always as JSON."""
+    _check_fence()
+    json_path, packed_path = _get_guild_paths(id_)
+    _get_archive_path(packed_path.name).unlink(missing_ok=True)
+    content = _to_json_dict(_from_json_dict(json_dict))  # validate
+    with gzip.open(_get_archive_path(json_path.name), "wt") as file:
+        json.dump(content, file)
+
+    history_archive = _get_archive_path(_get_history_path(id_).name)
+    if history:
+        with gzip.open(history_archive, "wb") as file:
+            file.write(history)
+    else:
+        history_archive.unlink(missing_ok=True)
+
+
+ArchivedJar = Tuple[JarData, Optional[JarHistory]]
+
+
+def archive_jars(id_: int, jars: Dict[Tuple[int, str], ArchivedJar]) -> None:
+    archived = read_archived_jars(id_)
+    for (member_id, name), (jar, jar_history) in jars.items():
+        archived[format_jar_key(member_id, name)] = {
+            "jar": dataclasses.asdict(jar),
+            "history": (
+                base64.b64encode(jar_history.to_bytes(member_id)).decode()
+                if jar_history
+                else None
+            ),
+        }
+    write_archived_jars(id_, archived)
+
+
+def restore_jars(id_: int, member_id: int) -> Dict[str, ArchivedJar]:
+    """Restore all archived jars of a member by jar name."""
+    if not _get_archived_jars_path(id_).exists():
+        return {}
+
+    archived = read_archived_jars(id_)
+    restored = {}
+    for key in list(archived):
+        archived_member_id, name = split_jar_key(key)
+        if archived_member_id != str(member_id):
+            continue
+        entry = archived.pop(key)
+        jar_history = None
+        if entry["history"]:
+            _, jar_history = JarHistory.from_bytes(
+                base64.b64decode(entry["history"]),
+            )
+        restored[name] = (JarData(**entry["jar"]), jar_history)
+    if restored:
+        write_archived_jars(id_, archived)
+    return restored
+
+
+def has_archived_jars(id_: int) -> bool:
+    return _get_archived_jars_path(id_).exists()
+
+
+def archived_jars_ids() -> list[int]:
+    ids = set()
+    for path in _get_archive_dir().glob("jars_*.json.gz"):
+        id_ = Path(path.stem).stem[len("jars_") :]
+        if id_.isdecimal():
+            ids.add(int(id_))
+    return sorted(ids)
+
+
+def read_departures() -> dict:
+    try:
+        with _get_departures_path().open() as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"guilds": {}, "members": {}}
+
+
+def write_departures(departures: dict) -> None:
+    _check_fence()
+    with _get_departures_path().open("w") as file:
+        json.dump(departures, file, indent=4)
+
+
+def read_archived_jars(id_: int) -> dict:
+    """Return the archived jars of a guild by jar key; see format_jar_key."""
+    try:
+        with gzip.open(_get_archived_jars_path(id_), "rt") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def write_archived_jars(id_: int, archived: dict) -> None:
+    _check_fence()
+    path = _get_archived_jars_path(id_)
+    if not archived:
+        path.unlink(missing_ok=True)
+        return
+    with gzip.open(path, "wt") as file:
+        json.dump(archived, file)
+
+
+def _check_fence() -> None:
+    if _fence:
+        _fence()
+
+
+def _compress(path: Path, archive_path: Path) -> None:
+    with path.open("rb") as src, gzip.open(archive_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    path.unlink()
+
+
+def _decompress(archive_path: Path, path: Path) -> None:
+    with gzip.open(archive_path, "rb") as src, path.open("wb") as dst:
+        shutil.copyfileobj(src, dst)
+    archive_path.unlink()
 
 
 def _get_guild_path(id_: int) -> Path:
+    """Return the guild file in the format it was written in last."""
+    json_path, packed_path = _get_guild_paths(id_)
+    try:
+        packed_mtime = packed_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return json_path
+    try:
+        if json_path.stat().st_mtime_ns > packed_mtime:
+            return json_path  # left over by a crash while changing formats
+    except FileNotFoundError:
+        pass
+    return packed_path
+
+
+def _get_guild_paths(id_: int) -> tuple[Path, Path]:
+    json_path = Path(_get_data_dir(), f"guild_{id_}.json")
+    return json_path, json_path.with_suffix(packed.SUFFIX)
+
+
+def _get_history_path(id_: int) -> Path:
+    return Path(_get_data_dir(), f"history_{id_}.bin")
+
+
+def _get_archived_jars_path(id_: int) -> Path:
+    return _get_archive_path(f"jars_{id_}.json")
+
+
+def _get_archive_path(name: str) -> Path:
+    return Path(_get_archive_dir(), f"{name}.gz")
+
+
+def _get_archive_dir() -> Path:
+    archive_dir = Path(_get_data_dir(), "archive")
+    if not archive_dir.exists():
+        archive_dir.mkdir()
+
+    return archive_dir
+
+
+def _get_departures_path() -> Path:
+    return Path(_get_data_dir(), "departures.json")
+
+
+def _get_data_dir() -> Path:
     data_dir = Path("data")
     if not data_dir.exists():
         data_dir.mkdir()
 
-    return Path(data_dir, f"guild_{id_}.json")
+    return data_dir
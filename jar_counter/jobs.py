@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+from typing import TYPE_CHECKING, Callable
+
+from discord.ext import tasks
+
+from . import jar_io
+from .data import Schedule
+from .lease import LeaseLostError
+
+
+if TYPE_CHECKING:
+    from .data import GuildData, Guilds
+
+
+def get_period(schedule: Schedule, now: datetime.datetime) -> int:
+    """Return a number that increases by one with every period."""
+    if schedule == Schedule.daily:
+        return now.toordinal()
+    if schedule == Schedule.weekly:
+        return (now.toordinal() - 1) // 7  # weeks starting on monday
+    if schedule == Schedule.monthly:
+        return now.year * 12 + now.month - 1
+    return 0
+
+
+def apply_due(data: GuildData, now: datetime.datetime) -> bool:
+    """Decay all jars once per period of the guild schedule.
+
+    The period is stored together with the counts, so a restart never applies
+    the same period twice.
+
+    Returns:
+        whether the jars were changed
+
+    """
+    if data.schedule == Schedule.never:
+        return False
+    period = get_period(data.schedule, now)
+    if period <= data.schedule_period:
+        return False
+
+    for (member_id, name), jar in data.jars.items():
+        removed = jar.count * data.decay // 100
+        if removed > 0:
+            jar.count -= removed
+            data.history.record_id(member_id, name, -removed)
+    data.schedule_period = period
+    return True
+
+
+class Jobs:
+    """Apply scheduled jobs of all guilds in the background.
+
+    Guilds are handled one at a time. Unloaded guilds are read, changed and
+    written without being cached in ``Guilds``.
+    """
+
+    def __init__(self, guilds: Guilds) -> None:
+        self._guilds = guilds
+        self._swept_day: int | None = None
+        # for loaded guilds, and unloaded ones with a scoreboard
+        self.on_applied: Callable[[int], None] | None = None
+
+    @tasks.loop(minutes=15)
+    async def job_loop(self) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if self._swept_day == now.toordinal():
+            return  # periods change at most once per day
+
+        count = 0
+        ids = set(jar_io.guild_ids()).union(self._guilds.loaded_ids())
+        for id_ in ids:
+            if data := self._guilds.get_loaded(id_):
+                if apply_due(data, now):
+                    data.dirty = True
+                    count += 1
+                    if self.on_applied:
+                        self.on_applied(id_)
+            else:
+                try:
+                    applied = _apply_unloaded(id_, now)
+                except FileNotFoundError:
+                    pass  # archived in the meantime
+                except LeaseLostError:
+                    raise
+                except Exception:  # noqa: BLE001 <- one guild must not stop all
+                    logging.getLogger("discord.jar.jobs").exception(
+                        "failed to apply scheduled jobs of guild %d",
+                        id_,
+                    )
+                else:
+                    if applied:
+                        count += 1
+                        # see Scoreboards.mark_all
+                        if applied.scoreboard_message_id and self.on_applied:
+                            self.on_applied(id_)
+            await asyncio.sleep(0)  # let commands run between guilds
+
+        self._swept_day = now.toordinal()
+        if count:
+            logging.getLogger("discord.jar.jobs").info(
+                "applied scheduled jobs of %d guilds",
+                count,
+            )
+
+
+def _apply_unloaded(id_: int, now: datetime.datetime) -> GuildData | None:
+    data = jar_io.read_guild(id_)
+    if not apply_due(data, now):
+        return None
+    jar_io.write_guild(id_, data)
+    return data
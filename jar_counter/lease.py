@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import time
+from pathlib import Path
+from typing import IO, Callable
+
+from discord.ext import tasks
+
+
+if os.name == "nt":  # "nt" is Windows
+    import msvcrt
+else:
+    import fcntl
+
+
+CHECK_INTERVAL = 5.0  # seconds between checks of the lock in the background
+_FENCE_INTERVAL = 1.0  # seconds a check is trusted before writing
+_LOCK_OFFSET = 2**30  # lock a byte past the content; readable on Windows
+
+
+class LeaseLostError(Exception):
+    """The lease was taken over; the data directory must not be written."""
+
+
+class Lease:
+    """Leadership lease on the data directory.
+
+    Only the holder of the lease may connect to Discord and write guild data.
+    The lease is an exclusive lock on a file held open by the holder, which
+    the operating system releases when the holder exits or crashes. No clocks
+    are compared, so clock skew between machines does not matter.
+
+    Every acquisition increments a fencing token stored in the file. The
+    holder checks the token before writing, so it stops writing even if the
+    lock was broken underneath it, e.g. by a network drive after a timeout.
+    """
+
+    def __init__(self, path: Path = Path("data", "leader.lock")) -> None:
+        self._path = path
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._file: IO[bytes] | None = None
+        self.token = 0
+        self._checked = float("-inf")
+        self.on_lost: Callable[[], None] | None = None
+
+    def try_acquire(self) -> bool:
+        """Acquire the lease unless another process holds it."""
+        if self._file:
+            return True
+
+        self._path.parent.mkdir(exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        file = os.fdopen(fd, "r+b")
+        if not _lock(file):
+            file.close()
+            return False
+
+        # the file may have been replaced before the lock was taken
+        if not _is_same_file(self._path, file):
+            _unlock(file)
+            file.close()
+            return False
+
+        self.token = _read(file).get("token", 0) + 1
+        content = {"token": self.token, "owner": self._owner}
+        file.seek(0)
+        file.truncate()
+        file.write(json.dumps(content).encode())
+        file.flush()
+        os.fsync(fd)
+        self._file = file
+        self._checked = time.monotonic()
+        return True
+
+    def check(self) -> None:
+        """Fence a write to the data directory.
+
+        Raises:
+            LeaseLostError: the lease is not held anymore
+
+        """
+        now = time.monotonic()
+        if now - self._checked < _FENCE_INTERVAL:
+            return
+        if not self._file:
+            raise LeaseLostError
+        try:
+            same_file = _is_same_file(self._path, self._file)
+            token = _read(self._file).get("token")
+        except OSError as exc:
+            raise LeaseLostError from exc
+        if not same_file or token != self.token:
+            raise LeaseLostError
+        self._checked = now
+
+    def release(self) -> None:
+        if file := self._file:
+            self._file = None
+            _unlock(file)
+            file.close()
+
+    @tasks.loop(seconds=CHECK_INTERVAL)
+    async def check_loop(self) -> None:
+        try:
+            self.check()
+        except LeaseLostError:
+            logging.getLogger("discord.jar.lease").error(
+                "lost leadership lease with token %d",
+                self.token,
+            )
+            self.release()
+            self.check_loop.stop()
+            if self.on_lost:
+                self.on_lost()
+
+
+def _lock(file: IO[bytes]) -> bool:
+    try:
+        if os.name == "nt":
+            file.seek(_LOCK_OFFSET)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.lockf(file, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, _LOCK_OFFSET)
+    except OSError:
+        return False  # held by another process
+    return True
+
+
+def _unlock(file: IO[bytes]) -> None:
+    try:
+        if os.name == "nt":
+            file.seek(_LOCK_OFFSET)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.lockf(file, fcntl.LOCK_UN, 1, _LOCK_OFFSET)
+    except OSError:
+        pass  # lock already broken
+
+
+def _is_same_file(path: Path, file: IO[bytes]) -> bool:
+    try:
+        return os.stat(path).st_ino == os.fstat(file.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _read(file: IO[bytes]) -> dict:
+    # read through the locked file; closing another handle to the file would
+    # drop the lock on POSIX
+    file.seek(0)
+    try:
+        return json.loads(file.read() or b"{}")
+    except ValueError:
+        return {}
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import bisect
+from typing import TYPE_CHECKING, Iterable
+
+import discord as dc
+
+from .data import get_jar_name
+from .errors import AmbiguousMemberError, NoJarError
+
+
+if TYPE_CHECKING:
+    from .data import Guilds
+
+
+_MAX_CHOICES = 25  # limit imposed by Discord
+_MAX_NAME_LENGTH = 32
+
+
+class _OwnerIndex:
+    """Jar owners of a guild sorted by casefolded display name."""
+
+    def __init__(self, members: Iterable[dc.Member] = ()) -> None:
+        self._names = {member.id: member.display_name for member in members}
+        # sorted once instead of inserting one at a time
+        self._entries = sorted(
+            (name.casefold(), member_id)
+            for member_id, name in self._names.items()
+        )
+
+    def __contains__(self, member_id: int) -> bool:
+        return member_id in self._names
+
+    def add(self, member_id: int, name: str) -> None:
+        if member_id in self._names:
+            self.remove(member_id)
+        self._names[member_id] = name
+        bisect.insort(self._entries, (name.casefold(), member_id))
+
+    def remove(self, member_id: int) -> None:
+        name = self._names.pop(member_id, None)
+        if name is None:
+            return
+        entry = (name.casefold(), member_id)
+        i = bisect.bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def find(self, prefix: str, limit: int) -> list[tuple[str, int]]:
+        prefix = prefix.casefold()
+        found = []
+        i = bisect.bisect_left(self._entries, (prefix,))
+        for key, member_id in self._entries[i : i + limit]:
+            if not key.startswith(prefix):
+                break
+            found.append((self._names[member_id], member_id))
+        return found
+
+    def match(self, name: str) -> int | None:
+        """Return the owner with a name, or the only one starting with it.
+
+        Raises:
+            AmbiguousMemberError: several owners match
+
+        """
+        key = name.casefold()
+        found = self.find(key, _MAX_CHOICES)  # exact matches sort first
+        exact = [
+            member_id
+            for found_name, member_id in found
+            if found_name.casefold() == key
+        ]
+        if len(exact) == 1:
+            return exact[0]
+        if len(found) == 1:
+            return found[0][1]
+        if found:
+            raise AmbiguousMemberError(name)
+        return None
+
+
+class Owners:
+    """Lazily built per-guild prefix index of jar owners for autocomplete.
+
+    Only guilds that requested suggestions are indexed. Other guilds ignore
+    the updates from ``add``, ``remove`` and ``rename``.
+    """
+
+    def __init__(self, guilds: Guilds) -> None:
+        self._guilds = guilds
+        self._indices: dict[int, _OwnerIndex] = {}
+
+    def find(
+        self,
+        intr: dc.Interaction,
+        prefix: str,
+        limit: int = _MAX_CHOICES,
+    ) -> list[tuple[str, int]]:
+        return self._get_index(intr).find(prefix, limit)
+
+    def resolve(self, intr: dc.Interaction, value: str) -> dc.Member | None:
+        if not intr.guild:
+            raise dc.app_commands.NoPrivateMessage
+
+        if value.isdecimal():
+            member_id = int(value)
+        elif (member_id := self._get_index(intr).match(value)) is None:
+            return None
+        return intr.guild.get_member(member_id)
+
+    def add(self, member: dc.Member) -> None:
+        if index := self._indices.get(member.guild.id):
+            index.add(member.id, member.display_name)
+
+    def remove(self, guild_id: int, member_id: int) -> None:
+        if index := self._indices.get(guild_id):
+            index.remove(member_id)
+
+    def rename(self, member: dc.Member) -> None:
+        index = self._indices.get(member.guild.id)
+        if index and member.id in index:
+            index.add(member.id, member.display_name)
+
+    def drop(self, guild_id: int) -> None:
+        self._indices.pop(guild_id, None)
+
+    def _get_index(self, intr: dc.Interaction) -> _OwnerIndex:
+        if not intr.guild:
+            raise dc.app_commands.NoPrivateMessage
+        if index := self._indices.get(intr.guild.id):
+            return index
+
+        # only reads the member ids of a packed guild, not its jars
+        member_ids = self._guilds[intr].jars.member_ids()
+        index = _OwnerIndex(
+            member
+            for member_id in member_ids
+            if (member := intr.guild.get_member(member_id))
+        )
+        self._indices[intr.guild.id] = index
+        return index
+
+
+class JarOwner(dc.app_commands.Transformer):
+    """Member option that only suggests members with a jar."""
+
+    async def autocomplete(  # pyright: ignore[reportIncompatibleMethodOverride]
+        self,
+        intr: dc.Interaction,
+        value: str,
+    ) -> list[dc.app_commands.Choice[str]]:
+        return [
+            dc.app_commands.Choice(name=name, value=str(member_id))
+            for name, member_id in _get_owners().find(intr, value)
+        ]
+
+    async def transform(self, intr: dc.Interaction, value: str) -> dc.Member:
+        if not (member := _get_owners().resolve(intr, value)):
+            raise NoJarError
+        return member
+
+
+class JarName(dc.app_commands.Transformer):
+    """Jar name option that suggests the names of existing jars."""
+
+    @property
+    def max_value(self) -> int:
+        return _MAX_NAME_LENGTH
+
+    async def autocomplete(  # pyright: ignore[reportIncompatibleMethodOverride]
+        self,
+        intr: dc.Interaction,
+        value: str,
+    ) -> list[dc.app_commands.Choice[str]]:
+        from .bot import bot  # prevent circular import
+
+        prefix = get_jar_name(value)
+        names = [
+            name
+            for name in bot.data[intr].jars.names()  # reads no jars if packed
+            if name and name.startswith(prefix)  # the default jar has no name
+        ]
+        return [
+            dc.app_commands.Choice(name=name, value=name)
+            for name in names[:_MAX_CHOICES]
+        ]
+
+    async def transform(self, intr: dc.Interaction, value: str) -> str:
+        return get_jar_name(value)
+
+
+def _get_owners() -> Owners:
+    from .bot import bot  # prevent circular import
+
+    return bot.owners
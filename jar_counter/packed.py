@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import mmap
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Iterator
+
+import discord as dc
+
+from .data import (
+    DEFAULT_JAR,
+    GuildData,
+    JarData,
+    Jars,
+    Schedule,
+    Visibility,
+)
+
+
+# Compact binary guild format; all numbers are little-endian.
+#
+#   preamble  magic, version, flags
+#   settings  fixed size guild settings and table sizes
+#   strings   moderator role name, then the interned scoreboard jar name,
+#             currencies and jar names; each with a u16 byte length and UTF-8
+#   ids       u64 member id per jar, sorted by member id and jar name
+#   counts    i64 count per jar, same order
+#   jars      u32 per jar, same order: currency string index << 1 | suffix
+#   names     u32 jar name string index per jar, same order
+#
+# Version 1 files have neither a scoreboard jar name nor jar names; all of
+# their jars are default jars.
+# With the compressed flag everything after the preamble is zlib compressed.
+# Uncompressed files are memory mapped and every jar is decoded on first use.
+
+MAGIC = b"JARG"
+SUFFIX = ".bin"
+
+_VERSION = 2
+_COMPRESSED = 0x01
+
+_PREAMBLE = struct.Struct("<4sBBxx")
+_SETTINGS_V1 = struct.Struct("<QBBBxiqQQII")
+_SETTINGS = struct.Struct("<QBBBxiqQQIII")
+_LENGTH = struct.Struct("<H")
+_ID = struct.Struct("<Q")
+_COUNT = struct.Struct("<q")
+_JAR = struct.Struct("<I")
+_NAME = struct.Struct("<I")
+
+# append only; the index is written to the file
+_VISIBILITIES = (Visibility.hidden, Visibility.visible)
+_SCHEDULES = (Schedule.never, Schedule.daily, Schedule.weekly, Schedule.monthly)
+
+
+def dumps(data: GuildData, *, compress: bool) -> bytes:
+    """Encode a guild.
+
+    Raises:
+        ValueError: a value does not fit into its fixed size field
+
+    """
+    items = sorted(data.jars.items())
+    strings = {data.moderator_role_name: 0}
+    strings.setdefault(data.scoreboard_jar, len(strings))
+    for (_, name), jar in items:
+        strings.setdefault(jar.currency, len(strings))
+        strings.setdefault(name, len(strings))
+
+    try:
+        parts = [
+            _SETTINGS.pack(
+                data.moderator_role_id,
+                _VISIBILITIES.index(data.responses_visibility),
+                data.mentions_use,
+                _SCHEDULES.index(data.schedule),
+                data.decay,
+                data.schedule_period,
+                data.scoreboard_channel_id,
+                data.scoreboard_message_id,
+                strings[data.scoreboard_jar],
+                len(items),
+                len(strings),
+            ),
+        ]
+        for string in strings:
+            encoded = string.encode()
+            parts += (_LENGTH.pack(len(encoded)), encoded)
+        parts += (_ID.pack(member_id) for (member_id, _), _ in items)
+        parts += (_COUNT.pack(jar.count) for _, jar in items)
+        parts += (
+            _JAR.pack(strings[jar.currency] << 1 | jar.suffix)
+            for _, jar in items
+        )
+        parts += (_NAME.pack(strings[name]) for (_, name), _ in items)
+    except struct.error as exc:
+        raise ValueError(exc) from exc
+
+    body = b"".join(parts)
+    if compress:
+        body = zlib.compress(body)
+    flags = _COMPRESSED if compress else 0
+    return _PREAMBLE.pack(MAGIC, _VERSION, flags) + body
+
+
+def loads(buffer: bytes) -> GuildData:
+    """Decode a guild with all jars.
+
+    Raises:
+        ValueError: not a valid packed guild
+
+    """
+    version, _ = _get_preamble(buffer)
+    data = _decode(_get_body(buffer), version)
+    data.jars.materialize()
+    return data
+
+
+def read(path: Path) -> GuildData:
+    """Read a guild, decoding its jars on first use.
+
+    Raises:
+        ValueError: not a valid packed guild
+
+    """
+    with path.open("rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        version, flags = _get_preamble(mapped)
+        if flags & _COMPRESSED:
+            data = _decode(_get_body(mapped), version)
+            mapped.close()
+            return data
+        return _decode(mapped, version, _PREAMBLE.size)
+    except ValueError:
+        mapped.close()
+        raise
+
+
+def _get_flags(buffer: Any) -> int:
+    return _get_preamble(buffer)[1]
+
+
+def _get_preamble(buffer: Any) -> tuple[int, int]:
+    magic, version, flags = _unpack(_PREAMBLE, buffer, 0)
+    if magic != MAGIC or not 1 <= version <= _VERSION:
+        raise ValueError("not a packed guild")
+    return version, flags
+
+
+def _get_body(buffer: Any) -> Any:
+    if not _get_flags(buffer) & _COMPRESSED:
+        return buffer[_PREAMBLE.size :]
+    try:
+        return zlib.decompress(buffer[_PREAMBLE.size :])
+    except zlib.error as exc:
+        raise ValueError(exc) from exc
+
+
+def _decode(body: Any, version: int, offset: int = 0) -> GuildData:
+    if version == 1:
+        *settings, jar_count, string_count = _unpack(_SETTINGS_V1, body, offset)
+        scoreboard_jar = None
+        offset += _SETTINGS_V1.size
+    else:
+        *settings, scoreboard_jar, jar_count, string_count = _unpack(
+            _SETTINGS,
+            body,
+            offset,
+        )
+        offset += _SETTINGS.size
+    (
+        moderator_role_id,
+        responses_visibility,
+        mentions_use,
+        schedule,
+        decay,
+        schedule_period,
+        scoreboard_channel_id,
+        scoreboard_message_id,
+    ) = settings
+
+    strings = []
+    for _ in range(string_count):
+        (length,) = _unpack(_LENGTH, body, offset)
+        offset += _LENGTH.size
+        strings.append(bytes(body[offset : offset + length]).decode())
+        offset += length
+    reader = _Reader(body, offset, jar_count, strings, named=version > 1)
+    if not strings or len(body) != reader.end:
+        raise ValueError("truncated packed guild")
+
+    try:
+        return GuildData(
+            LazyJars.from_reader(reader),
+            moderator_role_id,
+            strings[0],
+            _VISIBILITIES[responses_visibility],
+            bool(mentions_use),
+            _SCHEDULES[schedule],
+            decay,
+            schedule_period,
+            scoreboard_channel_id,
+            scoreboard_message_id,
+            DEFAULT_JAR if scoreboard_jar is None else strings[scoreboard_jar],
+        )
+    except IndexError as exc:
+        raise ValueError("invalid setting in packed guild") from exc
+
+
+def _unpack(format_: struct.Struct, buffer: Any, offset: int) -> tuple:
+    try:
+        return format_.unpack_from(buffer, offset)
+    except struct.error as exc:
+        raise ValueError(exc) from exc
+
+
+class _Reader:
+    """Decode single jars of a packed guild from a buffer or mapped file."""
+
+    def __init__(
+        self,
+        buffer: Any,
+        offset: int,
+        count: int,
+        strings: list[str],
+        *,
+        named: bool,
+    ) -> None:
+        self._buffer = buffer
+        self.count = count
+        self._strings = strings
+        self._ids = offset
+        self._counts = offset + count * _ID.size
+        self._jars = self._counts + count * _COUNT.size
+        self._names = self._jars + count * _JAR.size if named else None
+        record_size = _JAR.size + _NAME.size if named else _JAR.size
+        self.end = self._jars + count * record_size
+
+    def find(self, member_id: int, name: str) -> JarData | None:
+        # jars of a member are adjacent; find the first, then scan by name
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._id(middle) < member_id:
+                low = middle + 1
+            else:
+                high = middle
+        for index in range(low, self.count):
+            if self._id(index) != member_id:
+                break
+            if self._name(index) == name:
+                return self._jar(index)
+        return None
+
+    def __iter__(self) -> Iterator[tuple[tuple[int, str], JarData]]:
+        ids = _ID.iter_unpack(self._buffer[self._ids : self._counts])
+        for index, (member_id,) in enumerate(ids):
+            yield (member_id, self._name(index)), self._jar(index)
+
+    def member_ids(self) -> set[int]:
+        ids = self._buffer[self._ids : self._counts]
+        return {member_id for (member_id,) in _ID.iter_unpack(ids)}
+
+    def names(self) -> set[str]:
+        if self._names is None:
+            return {DEFAULT_JAR} if self.count else set()
+        names = self._buffer[self._names : self.end]
+        try:
+            return {
+                self._strings[index]
+                for index in {index for (index,) in _NAME.iter_unpack(names)}
+            }
+        except IndexError as exc:
+            raise ValueError("invalid jar name in packed guild") from exc
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def detach(self) -> None:
+        """Copy a mapped file to memory, so the file may be replaced."""
+        if isinstance(self._buffer, mmap.mmap):
+            mapped = self._buffer
+            self._buffer = mapped[:]
+            mapped.close()
+
+    def _id(self, index: int) -> int:
+        offset = self._ids + index * _ID.size
+        return _ID.unpack_from(self._buffer, offset)[0]
+
+    def _name(self, index: int) -> str:
+        if self._names is None:
+            return DEFAULT_JAR
+        offset = self._names + index * _NAME.size
+        (name,) = _NAME.unpack_from(self._buffer, offset)
+        try:
+            return self._strings[name]
+        except IndexError as exc:
+            raise ValueError("invalid jar name in packed guild") from exc
+
+    def _jar(self, index: int) -> JarData:
+        offset = self._counts + index * _COUNT.size
+        (count,) = _COUNT.unpack_from(self._buffer, offset)
+        (jar,) = _JAR.unpack_from(self._buffer, self._jars + index * _JAR.size)
+        try:
+            currency = self._strings[jar >> 1]
+        except IndexError as exc:
+            raise ValueError("invalid currency in packed guild") from exc
+        return JarData(currency, bool(jar & 1), count)
+
+
+class LazyJars(Jars):
+    """Jars of a packed guild, decoded on first use.
+
+    Looking up a single jar decodes only that jar, listing the owners or jar
+    names reads only the id or name column. Any other access decodes all
+    remaining jars once, after which this behaves like ``Jars``.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._reader: _Reader | None = None
+
+    @classmethod
+    def from_reader(cls, reader: _Reader) -> LazyJars:
+        jars = cls()
+        jars._reader = reader
+        return jars
+
+    def materialize(self) -> None:
+        if not (reader := self._reader):
+            return
+        self._reader = None
+        decoded = dict(dict.items(self))  # keep the jars in use
+        dict.clear(self)
+        for key, jar in reader:
+            dict.__setitem__(self, key, decoded.get(key, jar))
+        reader.close()
+        self._index()
+
+    def detach(self) -> None:
+        if self._reader:
+            self._reader.detach()
+
+    def get(self, key: tuple[int, str], default: Any = None) -> Any:
+        if self._reader and not dict.__contains__(self, key):
+            if (jar := self._reader.find(*key)) is None:
+                return default
+            dict.__setitem__(self, key, jar)
+        return dict.get(self, key, default)
+
+    def __getitem__(self, key: tuple[dc.Member, str]) -> JarData:
+        member, name = key
+        if (jar := self.get((member.id, name))) is None:
+            raise KeyError((member.id, name))
+        return jar
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, tuple) or not isinstance(key[0], dc.Member):
+            raise TypeError
+        member, name = key
+        return self.get((member.id, name)) is not None
+
+    def __len__(self) -> int:
+        return self._reader.count if self._reader else dict.__len__(self)
+
+    # everything below needs all jars
+
+    def __iter__(self) -> Iterator[tuple[int, str]]:
+        self.materialize()
+        return dict.__iter__(self)
+
+    def __setitem__(self, key: tuple[dc.Member, str], jar: JarData) -> None:
+        self.materialize()
+        super().__setitem__(key, jar)
+
+    def __delitem__(self, key: tuple[dc.Member, str]) -> None:
+        self.materialize()
+        super().__delitem__(key)
+
+    def __eq__(self, other: object) -> bool:
+        self.materialize()
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        self.materialize()
+        return super().__repr__()
+
+    def keys(self) -> Any:
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self) -> Any:
+        self.materialize()
+        return dict.values(self)
+
+    def items(self) -> Any:
+        self.materialize()
+        return dict.items(self)
+
+    def pop(self, key: tuple[int, str], *default: Any) -> Any:
+        self.materialize()
+        return super().pop(key, *default)
+
+    def named(self, name: str) -> dict[int, JarData]:
+        self.materialize()
+        return super().named(name)
+
+    def names(self) -> list[str]:
+        if self._reader:
+            return sorted(self._reader.names())
+        return super().names()
+
+    def member_ids(self) -> set[int]:
+        if self._reader:
+            return self._reader.member_ids()
+        return super().member_ids()
+
+    def of_member(self, member_id: int) -> dict[str, JarData]:
+        self.materialize()
+        return super().of_member(member_id)
+
+    def popitem(self) -> tuple[tuple[int, str], JarData]:
+        self.materialize()
+        key, jar = dict.popitem(self)
+        self._index()
+        return key, jar
+
+    def setdefault(self, *args: Any) -> Any:
+        self.materialize()
+        jar = dict.setdefault(self, *args)
+        self._index()
+        return jar
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self.materialize()
+        dict.update(self, *args, **kwargs)
+        self._index()
+
+    def clear(self) -> None:
+        self.materialize()
+        dict.clear(self)
+        self._index()
+
+    def copy(self) -> Jars:
+        self.materialize()
+        return Jars(dict.items(self))
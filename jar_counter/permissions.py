@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import TYPE_CHECKING
+
+import discord as dc
+
+from .errors import NoSuchRoleError
+
+
+if TYPE_CHECKING:
+    from .data import Guilds
+
+
+@dataclasses.dataclass
+class _GuildModerators:
+    role: dc.Role | None  # None if the stored role no longer exists
+    role_name: str
+
+
+class Moderators:
+    """Cache the moderator role per guild.
+
+    Members are checked against the cached role on every call; that only
+    looks up the role id among their roles, so nothing is cached per member,
+    which would grow with every member ever checked. Entries are invalidated
+    by gateway events, see the ``on_*`` methods of ``_JarBot``, and by changes
+    through ``/jar setup``.
+    """
+
+    def __init__(self, guilds: Guilds) -> None:
+        self._guilds = guilds
+        self._cache: dict[int, _GuildModerators] = {}
+
+    def check(self, intr: dc.Interaction) -> None:
+        if not isinstance(intr.user, dc.Member) or not intr.guild:
+            raise dc.app_commands.NoPrivateMessage
+
+        entry = self._get_entry(intr, intr.guild)
+        if not entry.role:
+            raise NoSuchRoleError(entry.role_name)
+        if not intr.user.get_role(entry.role.id):
+            raise dc.app_commands.MissingRole(entry.role.mention)
+
+    def invalidate_guild(self, guild_id: int) -> None:
+        self._cache.pop(guild_id, None)
+
+    def _get_entry(
+        self,
+        intr: dc.Interaction,
+        guild: dc.Guild,
+    ) -> _GuildModerators:
+        if entry := self._cache.get(guild.id):
+            return entry
+
+        data = self._guilds[intr]  # may raise GuildNotSetupError
+        role = guild.get_role(data.moderator_role_id)
+        if role and role.name != data.moderator_role_name:
+            # keep the stored name current for the error message once the
+            # role is removed
+            data.moderator_role_name = role.name
+            data.dirty = True
+
+        entry = _GuildModerators(role, data.moderator_role_name)
+        self._cache[guild.id] = entry
+        return entry
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import cProfile
+import gc
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .tracing import DIAGNOSTICS_DIR
+
+
+if TYPE_CHECKING:
+    from .data import Guilds
+
+
+DEFAULT_SECONDS = 30
+
+_TOP_FUNCTIONS = 30
+_TOP_ALLOCATIONS = 20
+_TOP_TYPES = 15
+_WATCHED_TYPES = ("GuildData", "JarData", "JarHistory", "_ConfirmView")
+
+
+class Profiler:
+    """Profile the running bot for a window of time.
+
+    Writes a cProfile dump, a tracemalloc snapshot and a text summary to the
+    diagnostics directory. The summary lists the slowest functions, the
+    allocation sites that grew during the window and instance counts.
+    """
+
+    def __init__(self, guilds: Guilds) -> None:
+        self._guilds = guilds
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, seconds: float = DEFAULT_SECONDS) -> None:
+        """Start profiling in the background, e.g. from a signal handler."""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(
+                self._profile(seconds),
+            )
+
+    async def run(self, seconds: float) -> Path | None:
+        """Profile and wait for the result.
+
+        Returns:
+            the path of the summary or None if a profile is already running
+
+        """
+        if self.running:
+            return None
+        self.start(seconds)
+        return await self._task  # type: ignore[misc]
+
+    async def _profile(self, seconds: float) -> Path:
+        logger = logging.getLogger("discord.jar.profile")
+        logger.info("start profiling for %.0f seconds", seconds)
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        guilds_before = len(self._guilds.loaded_ids())
+
+        profile = cProfile.Profile()
+        profile.enable()  # profiles the event loop thread, i.e. the whole bot
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+
+        after = tracemalloc.take_snapshot()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        DIAGNOSTICS_DIR.mkdir(exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        profile.dump_stats(Path(DIAGNOSTICS_DIR, f"profile_{stamp}.prof"))
+        after.dump(str(Path(DIAGNOSTICS_DIR, f"heap_{stamp}.snapshot")))
+
+        summary_path = Path(DIAGNOSTICS_DIR, f"summary_{stamp}.txt")
+        summary_path.write_text(
+            self._summarize(profile, before, after, guilds_before),
+            encoding="utf-8",
+        )
+        logger.info("finished profiling, see %s", summary_path)
+        return summary_path
+
+    def _summarize(
+        self,
+        profile: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        guilds_before: int,
+    ) -> str:
+        out = io.StringIO()
+
+        out.write(f"Slowest {_TOP_FUNCTIONS} functions by cumulative time:\n")
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_TOP_FUNCTIONS)
+
+        out.write(f"\nTop {_TOP_ALLOCATIONS} allocation sites by growth:\n")
+        for stat in after.compare_to(before, "lineno")[:_TOP_ALLOCATIONS]:
+            out.write(f"{stat}\n")
+
+        counts = collections.Counter(
+            type(obj).__name__ for obj in gc.get_objects()
+        )
+        out.write("\nInstances of watched types:\n")
+        for name in _WATCHED_TYPES:
+            out.write(f"{name}: {counts[name]}\n")
+        guilds_after = len(self._guilds.loaded_ids())
+        out.write(
+            f"Guilds._guilds: {guilds_after} loaded "
+            f"({guilds_after - guilds_before:+d} during window)\n",
+        )
+
+        out.write(f"\nTop {_TOP_TYPES} types by instance count:\n")
+        for name, count in counts.most_common(_TOP_TYPES):
+            out.write(f"{name}: {count}\n")
+        return out.getvalue()
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import dataclasses
+import heapq
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import discord as dc
+from discord.ext import tasks
+
+from . import jar_io
+
+
+if TYPE_CHECKING:
+    from .data import GuildData, Guilds, JarData
+
+
+_EDITS_PER_SECOND = 5  # across all guilds; well below the global rate limit
+_MAX_LINES = 25
+_MAX_LENGTH = 2000  # limit imposed by Discord
+_TITLE = "**Jar scoreboard**"
+
+
+@dataclasses.dataclass
+class _Board:
+    lines: dict[int, str] = dataclasses.field(default_factory=dict)
+    changed: set[int] = dataclasses.field(default_factory=set)
+    last_edit: float = float("-inf")
+    top: dict[int, int] | None = None  # counts by member id at the last render
+
+
+class Scoreboards:
+    """Keep the scoreboard messages of all guilds up to date.
+
+    Changes are collected per guild and written with at most one message edit
+    per ``window`` seconds and guild. Guilds waiting the longest are edited
+    first. Guilds not loaded, e.g. changed by scheduled jobs, are rendered
+    once from their file without loading them.
+    """
+
+    def __init__(self, guilds: Guilds, client: dc.Client) -> None:
+        self._guilds = guilds
+        self._client = client
+        self._boards: dict[int, _Board] = {}
+        self._pending: dict[int, None] = {}  # ordered set of guild ids
+        self.window = 30.0  # seconds
+
+    def mark(self, guild_id: int, member_id: int, name: str) -> None:
+        data = self._guilds.get_loaded(guild_id)
+        if not data or not data.scoreboard_message_id:
+            return
+        if name != data.scoreboard_jar:
+            return  # not on the scoreboard
+        self._boards.setdefault(guild_id, _Board()).changed.add(member_id)
+        self._pending.setdefault(guild_id)
+
+    def mark_all(self, guild_id: int) -> None:
+        """Rank all jars of a guild again at the next edit.
+
+        A guild not loaded is read for the edit, so only mark it if it has a
+        scoreboard.
+        """
+        data = self._guilds.get_loaded(guild_id)
+        if data and not data.scoreboard_message_id:
+            return
+        board = self._boards.setdefault(guild_id, _Board())
+        board.lines.clear()
+        board.top = None
+        self._pending.setdefault(guild_id)
+
+    def reset(self, guild_id: int) -> None:
+        """Forget the rendered lines, e.g. before posting a new scoreboard."""
+        self._boards.pop(guild_id, None)
+
+    def render(self, guild_id: int, data: GuildData) -> str:
+        board = self._boards.setdefault(guild_id, _Board())
+        top = _rank(board, data.jars.named(data.scoreboard_jar))
+        for member_id in board.changed:
+            board.lines.pop(member_id, None)
+        board.changed.clear()
+
+        title = _TITLE
+        if data.scoreboard_jar:
+            title = f"{_TITLE} of `{data.scoreboard_jar}` jars"
+        lines = [title]
+        for rank, (member_id, jar) in enumerate(top, 1):
+            if (line := board.lines.get(member_id)) is None:
+                line = board.lines[member_id] = f"<@{member_id}>: {jar}"
+            lines.append(f"{rank}. {line}")
+        if not top:
+            lines.append("No jars yet.")
+
+        content = "\n".join(lines)
+        if len(content) > _MAX_LENGTH:
+            content = content[: content.rfind("\n", 0, _MAX_LENGTH)]
+        return content
+
+    @tasks.loop(seconds=1)
+    async def edit_loop(self) -> None:
+        now = time.monotonic()
+        budget = _EDITS_PER_SECOND
+        for guild_id in list(self._pending):
+            if not budget:
+                break
+            board = self._boards.setdefault(guild_id, _Board())
+            if now - board.last_edit < self.window:
+                continue
+
+            del self._pending[guild_id]
+            budget -= 1
+            board.last_edit = now
+            data = self._guilds.get_loaded(guild_id)
+            if not data:
+                await self._edit_unloaded(guild_id)
+            elif data.scoreboard_message_id:
+                await self._edit(guild_id, data)
+
+    async def _edit_unloaded(self, guild_id: int) -> None:
+        mtime = jar_io.guild_mtime(guild_id)
+        try:
+            data = jar_io.read_guild(guild_id)
+        except (FileNotFoundError, ValueError, TypeError):
+            return  # archived in the meantime or invalid; see fsck
+        if not data.scoreboard_message_id:
+            return
+        await self._edit(guild_id, data)
+        if (
+            data.dirty  # message gone; see _edit
+            and not self._guilds.get_loaded(guild_id)
+            and jar_io.guild_mtime(guild_id) == mtime
+        ):
+            # unless changed during the edit; found out again at the next one
+            jar_io.write_guild(guild_id, data)
+
+    async def _edit(self, guild_id: int, data: GuildData) -> None:
+        channel = self._client.get_partial_messageable(
+            data.scoreboard_channel_id,
+            guild_id=guild_id,
+        )
+        message = channel.get_partial_message(data.scoreboard_message_id)
+        try:
+            await message.edit(
+                content=self.render(guild_id, data),
+                allowed_mentions=dc.AllowedMentions.none(),
+            )
+        except (dc.NotFound, dc.Forbidden):
+            # message deleted or permission revoked; stop updating
+            data.scoreboard_channel_id = 0
+            data.scoreboard_message_id = 0
+            data.dirty = True
+            self._boards.pop(guild_id, None)
+        except dc.HTTPException:
+            logging.getLogger("discord.jar.scoreboard").exception(
+                "failed to edit scoreboard of guild %d",
+                guild_id,
+            )
+            self._pending.setdefault(guild_id)  # retry after the window
+
+
+def _rank(board: _Board, jars: dict[int, JarData]) -> list[tuple[int, JarData]]:
+    """Update the top jars of a board from its changed jars only.
+
+    Unchanged jars outside the top rank no higher than the lowest top jar of
+    the last render. All jars are ranked again only if a changed jar drops
+    below that, e.g. when a top jar is reduced or deleted.
+    """
+    top = None
+    if (previous := board.top) is not None:
+        candidates = [
+            (member_id, jars[member_id])
+            for member_id in previous.keys() | board.changed
+            if member_id in jars
+        ]
+        top = heapq.nlargest(_MAX_LINES, candidates, key=_get_rank)
+        if len(previous) < _MAX_LINES:  # all jars were on the board
+            complete = len(candidates) == len(jars)
+        else:
+            floor = min(
+                (count, -member_id) for member_id, count in previous.items()
+            )
+            complete = len(top) == _MAX_LINES and _get_rank(top[-1]) >= floor
+        if not complete:
+            top = None
+    if top is None:
+        top = heapq.nlargest(_MAX_LINES, jars.items(), key=_get_rank)
+
+    board.top = {member_id: jar.count for member_id, jar in top}
+    return top
+
+
+def _get_rank(item: tuple[int, JarData]) -> tuple[int, int]:
+    member_id, jar = item
+    return jar.count, -member_id  # ties in a stable order between renders
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import sys
+import time
+from typing import TYPE_CHECKING
+
+from . import jar_io
+
+
+if TYPE_CHECKING:
+    from .data import Guilds
+    from .lease import Lease
+
+
+POLL_INTERVAL = 1.0
+
+
+def wait_for_lease(guilds: Guilds, lease: Lease) -> None:
+    """Keep all guilds loaded and up to date until the lease is acquired.
+
+    Guild files written by the lease holder are detected by their
+    modification time and read again. Never writes to the data directory.
+    """
+    sys.stderr.write("Standby: waiting for the leadership lease.\n")
+    mtimes: dict[int, tuple[int, int]] = {}
+    while True:
+        _sync(guilds, mtimes)
+        if lease.try_acquire():
+            break
+        time.sleep(POLL_INTERVAL)
+
+    _sync(guilds, mtimes)  # pick up the last writes of the previous holder
+    sys.stderr.write(f"Standby: taking over with {len(mtimes)} guilds.\n")
+
+
+def _sync(guilds: Guilds, mtimes: dict[int, tuple[int, int]]) -> None:
+    current = jar_io.guild_mtimes()
+    for id_ in mtimes.keys() - current.keys():  # archived
+        guilds.unload(id_)
+        del mtimes[id_]
+
+    for id_, mtime in current.items():
+        if mtimes.get(id_) == mtime:
+            continue
+        try:
+            # read all jars; a mapped file could not be replaced on Windows
+            guilds.replace(id_, jar_io.read_guild(id_, lazy=False))
+        except (FileNotFoundError, ValueError, TypeError):
+            continue  # archived or corrupt; retry on the next change
+        mtimes[id_] = mtime
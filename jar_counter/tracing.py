@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import contextlib
+import datetime
+import json
+import logging
+import logging.handlers
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    import discord as dc
+
+
+# Interactions slower than the threshold are appended to a rotating JSONL file.
+# Tracing is off unless configured; every entry point then returns right away.
+
+DIAGNOSTICS_DIR = Path("diagnostics")
+
+_KEY = "jar_trace"  # key in dc.Interaction.extras
+_MAX_BYTES = 5 * 1024 * 1024
+_BACKUP_COUNT = 3
+
+_threshold: float | None = None  # seconds
+_logger = logging.getLogger("discord.jar.trace")
+
+
+class _Trace:
+    __slots__ = ("start", "spans", "checked")
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.spans: list[tuple[str, float, float]] = []  # name, start, end
+        self.checked: float | None = None  # end of the last check
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_begin")
+
+    def __init__(self, trace: _Trace, name: str) -> None:
+        self._trace = trace
+        self._name = name
+        self._begin = 0.0
+
+    def __enter__(self) -> None:
+        self._begin = time.perf_counter()
+
+    def __exit__(self, *_: object) -> None:
+        end = time.perf_counter()
+        self._trace.spans.append((self._name, self._begin, end))
+        if self._name.startswith("check:"):
+            self._trace.checked = end
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def configure(threshold_ms: float | None) -> None:
+    global _threshold  # noqa: PLW0603
+    if not threshold_ms:
+        _threshold = None
+        return
+
+    _threshold = threshold_ms / 1000
+    DIAGNOSTICS_DIR.mkdir(exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        Path(DIAGNOSTICS_DIR, "traces.jsonl"),
+        maxBytes=_MAX_BYTES,
+        backupCount=_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+
+def start(intr: dc.Interaction) -> None:
+    if _threshold is not None:
+        intr.extras[_KEY] = _Trace()
+
+
+def span(intr: dc.Interaction, name: str) -> contextlib.AbstractContextManager:
+    if _threshold is None or not (trace := intr.extras.get(_KEY)):
+        return _NULL_SPAN
+    return _Span(trace, name)
+
+
+def finish(
+    intr: dc.Interaction,
+    exc: Exception | None = None,
+    guild_size: int | None = None,
+) -> None:
+    if _threshold is None or not (trace := intr.extras.pop(_KEY, None)):
+        return
+
+    end = time.perf_counter()
+    if end - trace.start < _threshold:
+        return
+
+    spans = [
+        {
+            "name": name,
+            "start_ms": _ms(begin - trace.start),
+            "ms": _ms(span_end - begin),
+        }
+        for name, begin, span_end in trace.spans
+    ]
+    if not exc:
+        handler_start = trace.checked or trace.start
+        spans.append(
+            {
+                "name": "handler",
+                "start_ms": _ms(handler_start - trace.start),
+                "ms": _ms(end - handler_start),
+            },
+        )
+
+    command = intr.command.qualified_name if intr.command else None
+    original = getattr(exc, "original", exc)  # unwrap CommandInvokeError
+    record = {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "command": command,
+        "guild_id": intr.guild_id,
+        "guild_jars": guild_size,
+        "outcome": type(original).__name__ if original else "ok",
+        "total_ms": _ms(end - trace.start),
+        "spans": spans,
+    }
+    _logger.info(json.dumps(record))
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)